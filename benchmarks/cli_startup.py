@@ -0,0 +1,125 @@
+"""Measure start-up cost of each CLI subcommand against a small seeded database.
+
+Every subcommand runs in a fresh interpreter under ``-X importtime``. The
+report has the median wall time, the median time spent importing modules,
+and any heavy modules (pandas, the server stack) the subcommand loaded.
+With ``--strict`` the run fails when a subcommand imports a heavy module
+it does not need, or when its median import time exceeds ``--max-import-ms``.
+
+Example::
+
+    python -m benchmarks.cli_startup --runs 5 --strict --max-import-ms 400
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.http_load import BENCH_PASSWORD, ROOT, git_revision
+from commands import seed
+from database import database
+
+MAIN = os.path.join(ROOT, 'main.py')
+HEAVY_MODULES = ('pandas', 'numpy', 'starlette', 'uvicorn', 'jwt', 'aiosqlite')
+LOGIN = ['login', '--login', 'user1', '--password', BENCH_PASSWORD]
+
+# name -> (arguments, stdin, heavy modules the subcommand may import)
+COMMANDS = {
+    'help': (['--help'], None, ()),
+    'migrate': (['migrate'], None, ()),
+    'register': (['register', '--password', 'password1'], 'newuser{run}\n', ()),
+    'list_users': (LOGIN + ['list_users'], None, ('pandas', 'numpy')),
+    'list_rooms': (LOGIN + ['list_rooms'], None, ('pandas', 'numpy')),
+    'show_room': (LOGIN + ['show_room', '--room_id', '1'], None, ('pandas', 'numpy')),
+    'rate_topic': (LOGIN + ['rate_topic', '--room_id', '1', '--rate', '5'], None, ()),
+    'change_topic': (LOGIN + ['change_topic', '--room_id', '1', '--topic', 'Bench'], None, ()),
+}
+
+IMPORT_LINE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def parse_importtime(stderr: str):
+    total_us, modules = 0, set()
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        cumulative, indent, name = match.groups()
+        modules.add(name.split('.')[0])
+        if not indent:
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def run_command(workdir: str, args: list, stdin, run: int):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', MAIN, *args], cwd=workdir, text=True,
+                            input=None if stdin is None else stdin.format(run=run),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    import_ms, modules = parse_importtime(result.stderr)
+    return result.returncode, elapsed_ms, import_ms, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="Runs per subcommand")
+    parser.add_argument('--commands', nargs='+', choices=sorted(COMMANDS), default=sorted(COMMANDS))
+    parser.add_argument('--strict', action='store_true', help="Exit non-zero on unneeded heavy imports")
+    parser.add_argument('--max-import-ms', type=float, help="Fail when a median import time exceeds this")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results, failures = {}, []
+    with tempfile.TemporaryDirectory() as workdir:
+        db = database.get_db(os.path.join(workdir, 'database.sqlite'))
+        database.initialize_db(db)
+        seed.seed_database(db, 100, 10, 10, votes=0.5, password=BENCH_PASSWORD)
+        db.dispose()
+
+        for name in args.commands:
+            command, stdin, allowed = COMMANDS[name]
+            wall, imports, heavy, errors = [], [], set(), 0
+            for run in range(args.runs):
+                returncode, elapsed_ms, import_ms, modules = run_command(workdir, command, stdin, run)
+                errors += returncode != 0
+                wall.append(elapsed_ms)
+                imports.append(import_ms)
+                heavy |= modules.intersection(HEAVY_MODULES)
+            results[name] = {
+                'errors': errors,
+                'wall_ms': round(statistics.median(wall), 3),
+                'import_ms': round(statistics.median(imports), 3),
+                'heavy_imports': sorted(heavy),
+            }
+            unexpected = sorted(heavy.difference(allowed))
+            if errors:
+                failures.append(f'{name}: {errors} failed runs')
+            if args.strict and unexpected:
+                failures.append(f'{name}: imports {", ".join(unexpected)}')
+            if args.max_import_ms is not None and results[name]['import_ms'] > args.max_import_ms:
+                failures.append(f'{name}: import time {results[name]["import_ms"]} ms')
+
+    report = {
+        'revision': git_revision(),
+        'config': vars(args),
+        'commands': results,
+        'failures': failures,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Load-test the Starlette API against a freshly seeded database.
+
+Example::
+
+    python -m benchmarks.http_load --users 2000 --rooms 500 --members 20 \
+        --workload mixed --concurrency 32 --duration 15 --output bench.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from commands import seed
+from database import database
+from rooms.vote_summary import RATING_RE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_PASSWORD = 'benchmark'
+
+WORKLOADS = {
+    'login': {'login': 1},
+    'vote': {'vote': 1},
+    'poll': {'show_room': 1, 'show_votes': 1},
+    'my_rooms': {'my_rooms': 1},
+    'mixed': {'login': 1, 'vote': 4, 'show_room': 6, 'show_votes': 8, 'my_rooms': 2},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    process = subprocess.Popen([sys.executable, '-m', 'uvicorn', '--factory', 'server:create_app',
+                                '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+                               cwd=workdir, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+
+class Client:
+    def __init__(self, port: int, stats: dict, lock: threading.Lock):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self.stats = stats
+        self.lock = lock
+        self.token = None
+
+    def request(self, route: str, method: str, path: str, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token is not None:
+            headers['Authorization'] = 'JWT ' + self.token
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=None if body is None else json.dumps(body), headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            data, status = b'', 0
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            route_stats = self.stats.setdefault(route, {'latencies': [], 'errors': 0})
+            route_stats['latencies'].append(elapsed)
+            if not 200 <= status < 400:
+                route_stats['errors'] += 1
+        return status, data
+
+    def login(self, user_id: int):
+        status, data = self.request('POST /api/users/login', 'POST', '/api/users/login',
+                                    {'login': f'user{user_id}', 'password': BENCH_PASSWORD})
+        if status == 200:
+            self.token = json.loads(data)['token']
+
+
+def run_worker(port, membership, user_rooms, workload, deadline, seed, stats, lock):
+    rnd = random.Random(seed)
+    client = Client(port, stats, lock)
+    user_id = rnd.choice(list(user_rooms))
+    client.login(user_id)
+    actions = list(workload)
+    weights = [workload[action] for action in actions]
+    while time.monotonic() < deadline:
+        action = rnd.choices(actions, weights)[0]
+        room_id = rnd.choice(user_rooms[user_id])
+        if action == 'login':
+            user_id = rnd.choice(membership[room_id])
+            client.login(user_id)
+        elif action == 'vote':
+            client.request('PUT /api/rooms/{id}/vote', 'PUT', f'/api/rooms/{room_id}/vote',
+                           {'vote': rnd.choice(RATING_RE)})
+        elif action == 'show_room':
+            client.request('GET /api/rooms/{id}', 'GET', f'/api/rooms/{room_id}')
+        elif action == 'show_votes':
+            client.request('GET /api/rooms/{id}/vote', 'GET', f'/api/rooms/{room_id}/vote')
+        elif action == 'my_rooms':
+            client.request('GET /api/rooms/my', 'GET', '/api/rooms/my')
+
+
+def percentile(values: list, fraction: float) -> float:
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(stats: dict, duration: float) -> dict:
+    report = {}
+    for route, route_stats in sorted(stats.items()):
+        latencies = sorted(route_stats['latencies'])
+        report[route] = {
+            'requests': len(latencies),
+            'errors': route_stats['errors'],
+            'throughput_rps': round(len(latencies) / duration, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        }
+    return report
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--members', type=int, default=20, help="Members per room, owner included")
+    parser.add_argument('--workload', choices=sorted(WORKLOADS), default='mixed')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10, help="Seconds to drive load for")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'database.sqlite')
+        db = database.get_db(path)
+        database.initialize_db(db)
+        seed.seed_database(db, args.users, args.rooms, args.members, votes=0.5, seed=args.seed,
+                           password=BENCH_PASSWORD)
+        membership, user_rooms = {}, {}
+        with db.connect() as conn:
+            for user_id, room_id in conn.exec_driver_sql("SELECT user_id, room_id FROM user_room"):
+                membership.setdefault(room_id, []).append(user_id)
+                user_rooms.setdefault(user_id, []).append(room_id)
+        db.dispose()
+
+        port = free_port()
+        server = start_server(workdir, port)
+        stats, lock = {}, threading.Lock()
+        try:
+            started = time.monotonic()
+            deadline = started + args.duration
+            workers = [threading.Thread(target=run_worker,
+                                        args=(port, membership, user_rooms, WORKLOADS[args.workload],
+                                              deadline, args.seed + i, stats, lock))
+                       for i in range(args.concurrency)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.monotonic() - started
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        'revision': git_revision(),
+        'config': vars(args),
+        'elapsed_s': round(elapsed, 3),
+        'routes': summarize(stats, elapsed),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,11 +7,17 @@ def clear_db(db):
     database.initialize_db(db)
 
 
+def get_database_path():
+    return os.path.join(
+        os.path.dirname(
+            os.path.abspath(__name__)
+        ), 'database.sqlite')
+
+
 def get_database():
-    db = database.get_db(
-        os.path.join(
-            os.path.dirname(
-                os.path.abspath(__name__)
-            ), 'database.sqlite')
-    )
+    db = database.get_db(get_database_path())
     return db
+
+
+def get_async_database():
+    return database.get_async_db(get_database_path())
@@ -0,0 +1,74 @@
+import csv
+import json
+import sys
+
+FORMATS = ('table', 'csv', 'jsonl', 'parquet')
+
+USER_COLUMNS = [('id', 'ID', 'int'), ('login', 'Login', 'str')]
+ROOM_COLUMNS = [('id', 'ID', 'int'), ('name', 'Name', 'str'), ('topic', 'Topic', 'str'),
+                ('description', 'Description', 'str'), ('users', 'Users in room', 'list'), ('owner', 'Owner', 'str')]
+
+
+def format_cell(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ', '.join(value)
+    return str(value)
+
+
+def write_table(chunks, columns, out):
+    widths = None
+    for chunk in chunks:
+        rows = [[format_cell(value) for value in row] for row in chunk]
+        if widths is None:
+            widths = [max([len(title)] + [len(row[i]) for row in rows]) for i, (_, title, _) in enumerate(columns)]
+            out.write('  '.join(title.ljust(width) for (_, title, _), width in zip(columns, widths)).rstrip() + '\n')
+        for row in rows:
+            out.write('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() + '\n')
+    if widths is None:
+        out.write('  '.join(title for _, title, _ in columns) + '\n')
+
+
+def write_csv(chunks, columns, out):
+    writer = csv.writer(out)
+    writer.writerow([key for key, _, _ in columns])
+    for chunk in chunks:
+        writer.writerows([format_cell(value) for value in row] for row in chunk)
+
+
+def write_jsonl(chunks, columns, out):
+    keys = [key for key, _, _ in columns]
+    for chunk in chunks:
+        out.writelines(json.dumps(dict(zip(keys, row)), ensure_ascii=False) + '\n' for row in chunk)
+
+
+def write_parquet(chunks, columns, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Parquet output needs pyarrow (pip install pyarrow)")
+        return
+    types = {'int': pa.int64(), 'str': pa.string(), 'list': pa.list_(pa.string())}
+    schema = pa.schema([(key, types[kind]) for key, _, kind in columns])
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array([row[i] for row in chunk], type=field.type) for i, field in enumerate(schema)],
+                schema=schema))
+
+
+def export(chunks, columns, format='table', output=None):
+    if format == 'parquet':
+        if output is None:
+            print("Parquet output needs --output")
+            return
+        write_parquet(chunks, columns, output)
+        return
+    writers = {'table': write_table, 'csv': write_csv, 'jsonl': write_jsonl}
+    if output is None:
+        writers[format](chunks, columns, sys.stdout)
+        return
+    with open(output, 'w', newline='' if format == 'csv' else None, encoding='utf-8') as out:
+        writers[format](chunks, columns, out)
@@ -1,5 +1,7 @@
+import settings
+from rooms import invites
+from rooms import rooms_async_service
 from rooms import rooms_service
-from users import users_service
 
 
 def create_room(db, user_id, name, password):
@@ -11,6 +13,14 @@ def create_room(db, user_id, name, password):
             print("Room with this name already exists. Choose other name.")
 
 
+async def create_room_async(db, user_id, name, password):
+    async with db.connect() as conn:
+        if await rooms_async_service.get_room_by_name(conn, name) is not None:
+            return False
+        await rooms_async_service.create_room(conn, user_id, name, password)
+        return True
+
+
 def delete_room(db, user_id, room_id):
     with db.connect() as conn:
         room = rooms_service.get_room(conn, room_id)
@@ -23,52 +33,74 @@ def delete_room(db, user_id, room_id):
         rooms_service.delete_room_by_id(conn, room_id)
 
 
-def list_rooms(db, filter=None):
+def iter_rooms(db, filter=None, chunk_size=1000):
+    with db.connect() as conn:
+        yield from rooms_service.iter_rooms_details(conn, filter, chunk_size)
+
+
+def search_rooms(db, text, limit=20, offset=0):
     with db.connect() as conn:
-        rooms_list = []
-        for room in rooms_service.get_all_rooms(conn):
-            user_list = []
-            joined_users = rooms_service.get_all_joined_users(conn, room.id)
-            room_owner = users_service.get_user(conn, room.owner)
-            topic = rooms_service.get_topic(conn, room.id)
-            for user_id in joined_users:
-                user_name = users_service.get_user(conn, user_id)
-                user_list.append(user_name.login)
-            if filter is None:
-                rooms_list.append(
-                    [room.id, room.name, topic.topic, topic.topic_dsc, sorted(user_list), room_owner.login])
-            elif filter in user_list:
-                rooms_list.append(
-                    [room.id, room.name, topic.topic, topic.topic_dsc, sorted(user_list), room_owner.login])
-    return rooms_list
+        return rooms_service.search_rooms(conn, text, limit, offset)
+
+
+async def search_rooms_async(db, text, limit=20, offset=0):
+    async with db.connect() as conn:
+        return await rooms_async_service.search_rooms(conn, text, limit, offset)
+
+
+async def list_user_rooms_async(db, user_id, after=0, limit=100):
+    async with db.connect() as conn:
+        return await rooms_async_service.get_user_rooms(conn, user_id, after, limit)
 
 
 def show_room(db, user_id, room_id):
     with db.connect() as conn:
-        rooms_list = []
-        room = rooms_service.get_room(conn, room_id)
-        joined_users = rooms_service.get_all_joined_users(conn, room_id)
-        room_topic = rooms_service.get_topic(conn, room_id)
-        room_owner = users_service.get_user(conn, room.owner)
-        if user_id in joined_users:
-            user_list = []
-            for room_user_id in joined_users:
-                user_name = users_service.get_user(conn, room_user_id)
-                user_list.append(user_name.login)
-            rooms_list.append([room.id, room.name, room_topic.topic, room_topic.topic_dsc, user_list, room_owner.login])
-            return rooms_list
-        else:
+        if rooms_service.get_rating(conn, user_id, room_id) is None:
             return None
+        return rooms_service.get_rooms_details(conn, room_id=room_id)
+
+
+async def show_room_async(db, user_id, room_id):
+    async with db.connect() as conn:
+        if await rooms_async_service.get_rating(conn, user_id, room_id) is None:
+            return None
+        return await rooms_async_service.get_rooms_details(conn, room_id=room_id)
+
+
+async def room_details_async(db, room_id):
+    async with db.connect() as conn:
+        return await rooms_async_service.get_rooms_details(conn, room_id=room_id)
+
+
+async def room_version_async(db, room_id, user_id=None):
+    async with db.connect() as conn:
+        if user_id is not None and not await rooms_async_service.is_member(conn, user_id, room_id):
+            return None
+        return await rooms_async_service.get_room_version(conn, room_id)
 
 
 def rating_of_room(db, room_id):
     with db.connect() as conn:
-        users_ratings = []
-        joined_users = rooms_service.get_all_joined_users(conn, room_id)
-        for user_login in joined_users:
-            rating = rooms_service.get_rating(conn, user_login, room_id)
-            users_ratings.append([users_service.get_user(conn, user_login).login, rating[3]])
-    return users_ratings
+        members = rooms_service.get_rooms_members(conn, room_id=room_id)
+    return [[member[2], member[3]] for member in members.get(int(room_id), [])]
+
+
+async def rating_of_room_async(db, room_id):
+    async with db.connect() as conn:
+        members = await rooms_async_service.get_rooms_members(conn, room_id=room_id)
+    return [[member[2], member[3]] for member in members.get(int(room_id), [])]
+
+
+async def iter_votes_async(db, room_id, chunk_size=500):
+    async with db.connect() as conn:
+        async for chunk in rooms_async_service.iter_room_votes(conn, room_id, chunk_size):
+            yield [[row[0], row[1]] for row in chunk]
+
+
+async def vote_summary_async(db, room_id):
+    async with db.connect() as conn:
+        summary = await rooms_async_service.get_vote_summary(conn, room_id)
+    return summary.as_dict()
 
 
 def join_room(db, user_id, room_id, password):
@@ -77,12 +109,53 @@ def join_room(db, user_id, room_id, password):
             print("Wrong room/password or you are already in this room")
 
 
+async def join_room_async(db, user_id, room_id, password):
+    async with db.connect() as conn:
+        return await rooms_async_service.join_room(conn, user_id, room_id, password)
+
+
+def invite_ttl(ttl=None):
+    return min(ttl or settings.INVITE_TTL, settings.INVITE_MAX_TTL)
+
+
+def create_invite(db, user_id, room_id, ttl=None):
+    with db.connect() as conn:
+        token = rooms_service.create_invite(conn, user_id, room_id, invite_ttl(ttl))
+    if token is None:
+        print("Room doesn't exist or you are not its owner")
+        return 'err_not_owner'
+    print(token)
+    return token
+
+
+async def create_invite_async(db, user_id, room_id, ttl=None):
+    async with db.connect() as conn:
+        return await rooms_async_service.create_invite(conn, user_id, room_id, invite_ttl(ttl))
+
+
+def join_room_with_invite(db, user_id, token):
+    room_id = invites.invite_room_id(token)
+    with db.connect() as conn:
+        if room_id is None or not rooms_service.join_room_with_invite(conn, user_id, room_id, token):
+            print("Invalid or expired invite or you are already in this room")
+
+
+async def join_room_with_invite_async(db, user_id, room_id, token):
+    async with db.connect() as conn:
+        return await rooms_async_service.join_room_with_invite(conn, user_id, room_id, token)
+
+
 def leave_room(db, user_id, room_id):
     with db.connect() as conn:
         if not rooms_service.leave_room(conn, user_id, room_id):
             print("You are not in this room or such room doesn't exist")
 
 
+async def leave_room_async(db, user_id, room_id):
+    async with db.connect() as conn:
+        return await rooms_async_service.leave_room(conn, user_id, room_id)
+
+
 def change_topic(db, user_id, room_id, topic, desc):
     with db.connect() as conn:
         if not rooms_service.update_room(conn, user_id, room_id, topic, desc):
@@ -95,6 +168,16 @@ def change_pass(db, user_id, room_id, password):
             print("Room doesn't exist or you are not the owner")
 
 
+async def change_topic_async(db, user_id, room_id, topic, desc):
+    async with db.connect() as conn:
+        return await rooms_async_service.update_room(conn, user_id, room_id, topic, desc)
+
+
+async def change_pass_async(db, user_id, room_id, password):
+    async with db.connect() as conn:
+        return await rooms_async_service.update_room(conn, user_id, room_id, password=password)
+
+
 def remove_topic(db, user_id, room_id):
     with db.connect() as conn:
         if not rooms_service.update_room(conn, user_id, room_id):
@@ -105,3 +188,10 @@ def rate_topic(db, user_id, room_id, rate):
     with db.connect() as conn:
         if not rooms_service.update_rating_of_room(conn, user_id, room_id, rate):
             print("You are not in the room, entered not allowed rating or topic is not set")
+
+
+async def rate_topic_async(db, user_id, room_id, rate, batcher=None):
+    if batcher is not None:
+        return await batcher.submit(user_id, room_id, rate)
+    async with db.connect() as conn:
+        return await rooms_async_service.update_rating_of_room(conn, user_id, room_id, rate)
@@ -0,0 +1,77 @@
+import itertools
+import random
+import time
+
+from rooms.vote_summary import RATING_RE
+from users import passwords
+
+
+def insert_batched(conn, statement: str, rows, batch_size: int) -> int:
+    total = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, batch_size))
+        if not chunk:
+            return total
+        conn.executemany(statement, chunk)
+        conn.commit()
+        total += len(chunk)
+
+
+def delete_seeded(conn, user_ids: range, room_ids: range):
+    for table, column, ids in (('user_room', 'room_id', room_ids), ('topics', 'room_id', room_ids),
+                               ('rooms', 'room_id', room_ids), ('user_room', 'user_id', user_ids),
+                               ('users', 'user_id', user_ids)):
+        if ids:
+            conn.execute(f"DELETE FROM {table} WHERE {column} BETWEEN ? AND ?", (ids[0], ids[-1]))
+    conn.commit()
+
+
+def seed_database(db, users: int, rooms: int, members: int, votes: float = 0.0, seed: int = 0,
+                  password: str = 'password', prefix: str = 'user', batch_size: int = 50000) -> dict:
+    """Inserts the rows in committed batches; if a batch fails, the rows already committed are deleted again."""
+    if rooms > 0 and users <= 0:
+        raise ValueError("Seeding rooms needs at least one user to own them")
+    prefix = prefix.lower()
+    rnd = random.Random(seed)
+    hashed_psw = passwords.hash_password(password)
+    started = time.perf_counter()
+    conn = db.raw_connection()
+    user_ids = room_ids = range(0)
+    try:
+        first_user = conn.execute("SELECT COALESCE(MAX(user_id), 0) FROM users").fetchone()[0] + 1
+        first_room = conn.execute("SELECT COALESCE(MAX(room_id), 0) FROM rooms").fetchone()[0] + 1
+        user_ids = range(first_user, first_user + max(users, 0))
+        room_ids = range(first_room, first_room + max(rooms, 0))
+        members = min(members, users)
+        owners = [rnd.choice(user_ids) for _ in room_ids]
+
+        def memberships():
+            for room_id, owner_id in zip(room_ids, owners):
+                others = [user_id for user_id in rnd.sample(user_ids, members) if user_id != owner_id]
+                for user_id in [owner_id] + others[:members - 1]:
+                    rating = rnd.choice(RATING_RE) if rnd.random() < votes else None
+                    yield user_id, room_id, rating
+
+        counts = {
+            'users': insert_batched(conn, "INSERT INTO users (user_id, login, password) VALUES (?, ?, ?)",
+                                    ((user_id, f'{prefix}{user_id}', hashed_psw) for user_id in user_ids),
+                                    batch_size),
+            'rooms': insert_batched(conn, "INSERT INTO rooms (room_id, name, password, owner_id) VALUES (?, ?, ?, ?)",
+                                    ((room_id, f'room{room_id}', hashed_psw, owner_id)
+                                     for room_id, owner_id in zip(room_ids, owners)),
+                                    batch_size),
+            'topics': insert_batched(conn, "INSERT INTO topics (room_id, topic, topic_dsc) VALUES (?, ?, ?)",
+                                     ((room_id, f'Topic {room_id}', 'None') for room_id in room_ids),
+                                     batch_size),
+            'user_room': insert_batched(conn, "INSERT INTO user_room (user_id, room_id, topic_rating) VALUES (?, ?, ?)",
+                                        memberships(), batch_size),
+        }
+    except Exception:
+        conn.rollback()
+        delete_seeded(conn, user_ids, room_ids)
+        raise
+    finally:
+        conn.close()
+    counts['seconds'] = round(time.perf_counter() - started, 2)
+    return counts
@@ -1,3 +1,5 @@
+from users import tokens_service
+from users import users_async_service
 from users import users_service
 
 
@@ -14,6 +16,14 @@ def set_user_login(db, user_login, password):
     return user
 
 
+async def login_async(db, user_login, password):
+    async with db.connect() as conn:
+        user = await users_async_service.login(conn, user_login, password)
+        if user is None:
+            return 'err_wrong_credentials'
+    return user
+
+
 def register_user(db, user_login, password):
     with db.connect() as conn:
         if not users_service.validate_login(user_login):
@@ -29,17 +39,54 @@ def register_user(db, user_login, password):
         users_service.create_user(conn, user_login, password)
 
 
+async def register_user_async(db, user_login, password):
+    async with db.connect() as conn:
+        if not users_service.validate_login(user_login) or not users_service.validate_password(password):
+            return 'err_wrong_data'
+        if await users_async_service.has_user(conn, user_login):
+            return 'err_user_exists'
+
+        await users_async_service.create_user(conn, user_login, password)
+
+
 def remove_user(db, user):
     with db.connect() as conn:
         users_service.remove_user(conn, user)
 
 
-def list_users(db, filter=None):
+def iter_users(db, filter=None, chunk_size=1000, prefix=None, after=None, limit=None):
+    with db.connect() as conn:
+        yield from users_service.iter_users(conn, filter, chunk_size, prefix, after, limit)
+
+
+async def list_users_async(db, prefix=None, after=None, limit=100):
+    async with db.connect() as conn:
+        return await users_async_service.search_users(conn, prefix, after, limit)
+
+
+async def issue_refresh_token_async(db, user_id):
+    async with db.connect() as conn:
+        return await users_async_service.issue_refresh_token(conn, user_id)
+
+
+async def refresh_async(db, refresh_token):
+    async with db.connect() as conn:
+        result = await users_async_service.rotate_refresh_token(conn, refresh_token)
+        if result is None:
+            return 'err_invalid_token'
+    return result
+
+
+async def logout_async(db, refresh_token):
+    async with db.connect() as conn:
+        await users_async_service.revoke_refresh_token(conn, refresh_token)
+
+
+def revoke_tokens(db, user_login):
     with db.connect() as conn:
-        users_list = []
-        for user in users_service.get_all_users(conn):
-            if filter is None:
-                users_list.append([user.user_id, user.login])
-            elif user.login.find(filter) > -1:
-                users_list.append([user.user_id, user.login])
-        return users_list
+        user = users_service.get_user_credentials(conn, user_login)
+        if user is None:
+            print("User doesn't exist!")
+            return 'err_no_user'
+        count = tokens_service.revoke_user_tokens(conn, user[0])
+    print(f"Revoked {count} refresh tokens")
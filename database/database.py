@@ -1,7 +1,22 @@
 import sqlalchemy as database
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, event
+from sqlalchemy.pool import QueuePool
 import contextlib
 
+import settings
+from database import migrations
+from database.query_stats import track_queries
+
+PRAGMAS = {
+    'foreign_keys': 'ON',
+    'journal_mode': settings.SQLITE_JOURNAL_MODE,
+    'synchronous': settings.SQLITE_SYNCHRONOUS,
+    'busy_timeout': settings.SQLITE_BUSY_TIMEOUT,
+    'mmap_size': settings.SQLITE_MMAP_SIZE,
+    'cache_size': settings.SQLITE_CACHE_SIZE,
+    'temp_store': settings.SQLITE_TEMP_STORE,
+}
+
 def clear_db(db):
     meta = MetaData()
 
@@ -53,11 +68,61 @@ def initialize_db(db):
                         UNIQUE(room_id, user_id)
                     )
                 ''')
+    migrations.migrate(db)
+
+
+@contextlib.contextmanager
+def transaction(db):
+    if db.in_transaction():
+        yield db
+        return
+    try:
+        with db.begin():
+            yield db
+    finally:
+        callbacks = db.info.pop('after_commit', [])
+    for callback in callbacks:
+        callback()
+
+
+def after_commit(db, callback):
+    if db.in_transaction():
+        db.info.setdefault('after_commit', []).append(callback)
+    else:
+        callback()
+
+
+def apply_pragmas(engine, pragmas=None):
+    pragmas = PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return engine
+
+
+def get_db(path, pragmas=None):
+    engine = database.create_engine('sqlite:///'+path,
+                                    poolclass=QueuePool,
+                                    pool_size=settings.SQLITE_POOL_SIZE,
+                                    max_overflow=settings.SQLITE_MAX_OVERFLOW,
+                                    connect_args={'check_same_thread': False})
+    apply_pragmas(engine, pragmas)
+    return track_queries(engine)
 
 
-def get_db(path):
-    engine = database.create_engine('sqlite:///'+path)
-    connection = engine.connect()
-    connection.execute("PRAGMA foreign_keys = ON")
+def get_async_db(path, pragmas=None):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+    engine = create_async_engine('sqlite+aiosqlite:///'+path,
+                                 poolclass=AsyncAdaptedQueuePool,
+                                 pool_size=settings.SQLITE_POOL_SIZE,
+                                 max_overflow=settings.SQLITE_MAX_OVERFLOW)
+    apply_pragmas(engine.sync_engine, pragmas)
+    track_queries(engine.sync_engine)
     return engine
@@ -0,0 +1,105 @@
+from database import database
+
+MIGRATIONS = [
+    (1, [
+        "CREATE INDEX IF NOT EXISTS rooms_name ON rooms (name)",
+        "CREATE INDEX IF NOT EXISTS user_room_user_id ON user_room (user_id, room_id)",
+        "CREATE INDEX IF NOT EXISTS user_room_room_rating ON user_room (room_id, topic_rating)",
+    ]),
+    (2, [
+        '''
+                    CREATE TABLE IF NOT EXISTS room_events (
+                        event_id integer PRIMARY KEY AUTOINCREMENT,
+                        origin text NOT NULL,
+                        room_id integer NOT NULL,
+                        payload text NOT NULL,
+                        created_at real NOT NULL
+                    )
+                ''',
+        "CREATE INDEX IF NOT EXISTS room_events_created_at ON room_events (created_at)",
+    ]),
+    (3, [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS rooms_search USING fts5(name, topic, topic_dsc, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        "INSERT INTO rooms_search (rowid, name, topic, topic_dsc) "
+        "SELECT r.room_id, r.name, NULLIF(t.topic, 'None'), NULLIF(t.topic_dsc, 'None') "
+        "FROM rooms r LEFT JOIN topics t ON t.room_id = r.room_id",
+        '''
+                    CREATE TRIGGER IF NOT EXISTS rooms_search_room_insert AFTER INSERT ON rooms BEGIN
+                        INSERT INTO rooms_search (rowid, name) VALUES (new.room_id, new.name);
+                    END
+                ''',
+        '''
+                    CREATE TRIGGER IF NOT EXISTS rooms_search_room_update AFTER UPDATE OF name ON rooms BEGIN
+                        UPDATE rooms_search SET name = new.name WHERE rowid = new.room_id;
+                    END
+                ''',
+        '''
+                    CREATE TRIGGER IF NOT EXISTS rooms_search_room_delete AFTER DELETE ON rooms BEGIN
+                        DELETE FROM rooms_search WHERE rowid = old.room_id;
+                    END
+                ''',
+        '''
+                    CREATE TRIGGER IF NOT EXISTS rooms_search_topic_insert AFTER INSERT ON topics BEGIN
+                        UPDATE rooms_search SET topic = NULLIF(new.topic, 'None'),
+                            topic_dsc = NULLIF(new.topic_dsc, 'None') WHERE rowid = new.room_id;
+                    END
+                ''',
+        '''
+                    CREATE TRIGGER IF NOT EXISTS rooms_search_topic_update AFTER UPDATE ON topics BEGIN
+                        UPDATE rooms_search SET topic = NULLIF(new.topic, 'None'),
+                            topic_dsc = NULLIF(new.topic_dsc, 'None') WHERE rowid = new.room_id;
+                    END
+                ''',
+        '''
+                    CREATE TRIGGER IF NOT EXISTS rooms_search_topic_delete AFTER DELETE ON topics BEGIN
+                        UPDATE rooms_search SET topic = NULL, topic_dsc = NULL WHERE rowid = old.room_id;
+                    END
+                ''',
+    ]),
+    (4, [
+        "ALTER TABLE rooms ADD COLUMN version integer NOT NULL DEFAULT 0",
+    ]),
+    (5, [
+        '''
+                    CREATE TABLE IF NOT EXISTS refresh_tokens (
+                        token_hash text PRIMARY KEY,
+                        user_id integer NOT NULL,
+                        expires_at real NOT NULL,
+                        revoked integer NOT NULL DEFAULT 0,
+                        FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
+                    ) WITHOUT ROWID
+                ''',
+        "CREATE INDEX IF NOT EXISTS refresh_tokens_user_id ON refresh_tokens (user_id)",
+    ]),
+]
+
+
+def get_version(conn) -> int:
+    with database.transaction(conn):
+        conn.exec_driver_sql('''
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version integer PRIMARY KEY,
+                        applied_at text NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+        return conn.exec_driver_sql("SELECT COALESCE(MAX(version), 0) FROM schema_version").scalar()
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0]
+
+
+def migrate(db) -> list:
+    applied = []
+    with db.connect() as conn:
+        current = get_version(conn)
+        for version, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            with database.transaction(conn):
+                for statement in statements:
+                    conn.exec_driver_sql(statement)
+                conn.exec_driver_sql("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            applied.append(version)
+    return applied
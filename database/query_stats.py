@@ -0,0 +1,50 @@
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+
+class QueryStats:
+    def __init__(self, record_statements: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = [] if record_statements else None
+
+
+current: ContextVar[Optional[QueryStats]] = ContextVar('query_stats', default=None)
+
+
+@contextlib.contextmanager
+def collect(record_statements: bool = False):
+    parent = current.get()
+    stats = QueryStats(record_statements)
+    token = current.set(stats)
+    try:
+        yield stats
+    finally:
+        current.reset(token)
+        if parent is not None:
+            parent.count += stats.count
+            parent.seconds += stats.seconds
+
+
+def track_queries(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current.get() is not None:
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current.get()
+        if stats is None or not conn.info.get('query_start'):
+            return
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        stats.count += 1
+        stats.seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append((statement, parameters, elapsed))
+
+    return engine
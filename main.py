@@ -1,22 +1,54 @@
+import re
+
 import click
-import pandas as pd
 
 import database.database
-import server
+import database.migrations
+import settings
 from commands import db
+from commands import export
 from commands import rooms
+from commands import seed
 from commands import users
+from users import users_service
+
+
+def print_table(rows, columns):
+    import pandas as pd
+    print(pd.DataFrame(rows, columns=columns))
+
+
+# Commands that create or upgrade the schema themselves.
+SCHEMA_COMMANDS = ('initialize-db', 'migrate', 'run_as_server')
 
 
 @click.group()
 @click.pass_context
 def run_application(ctx):
     ctx.obj = {'db': db.get_database()}
+    if ctx.invoked_subcommand in SCHEMA_COMMANDS:
+        return
+    with ctx.obj['db'].connect() as conn:
+        version = database.migrations.get_version(conn)
+    if version < database.migrations.latest_version():
+        raise click.ClickException(f"Database schema is at version {version}, expected "
+                                   f"{database.migrations.latest_version()}; run `python main.py migrate` first")
 
 
 @run_application.command('run_as_server', help="Runs uvicorn server")
-def run_as_server():
-    server.run()
+@click.option('--host', default=settings.HOST, show_default=True, help="Address to bind")
+@click.option('--port', type=int, default=settings.PORT, show_default=True, help="Port to bind")
+@click.option('--workers', type=click.IntRange(min=1), default=settings.WORKERS, show_default=True,
+              help="Number of worker processes")
+@click.option('--loop', type=click.Choice(['auto', 'asyncio', 'uvloop']), default='auto', show_default=True,
+              help="Event loop implementation")
+@click.option('--http', type=click.Choice(['auto', 'h11', 'httptools']), default='auto', show_default=True,
+              help="HTTP protocol implementation")
+@click.option('--timeout-keep-alive', type=int, default=5, show_default=True,
+              help="Seconds to keep idle connections open")
+def run_as_server(host, port, workers, loop, http, timeout_keep_alive):
+    import server
+    server.run(host, port, workers, loop, http, timeout_keep_alive)
 
 
 @run_application.command('initialize-db', help="Recreate DB")
@@ -26,6 +58,38 @@ def clear_db(obj):
     database.database.initialize_db(db)
 
 
+@run_application.command('migrate', help="Upgrade DB schema in place, keeping data")
+@click.pass_obj
+def migrate(obj):
+    db = obj['db']
+    applied = database.migrations.migrate(db)
+    if applied:
+        print("Applied migrations: " + ", ".join(str(version) for version in applied))
+    else:
+        print("Database is up to date")
+
+
+@run_application.command('seed', help="Bulk-generate synthetic users, rooms, memberships and votes")
+@click.option('--users', type=int, default=1000, show_default=True, help="Number of users to create")
+@click.option('--rooms', type=int, default=100, show_default=True, help="Number of rooms to create")
+@click.option('--members', type=int, default=10, show_default=True, help="Members per room, owner included")
+@click.option('--votes', type=click.FloatRange(0, 1), default=0.5, show_default=True,
+              help="Share of memberships that get a random vote")
+@click.option('--seed', 'random_seed', type=int, default=0, show_default=True, help="Random seed")
+@click.option('--password', default='password', show_default=True, help="Password of every user and room")
+@click.option('--prefix', default='user', show_default=True, help="Prefix of generated logins, lowercased")
+@click.option('--batch-size', type=int, default=50000, show_default=True, help="Rows per executemany/commit")
+@click.pass_obj
+def seed_db(obj, users, rooms, members, votes, random_seed, password, prefix, batch_size):
+    if rooms > 0 and users <= 0:
+        raise click.UsageError("--rooms needs --users > 0 to pick room owners from")
+    if not re.match(users_service.LOGIN_RE, prefix):
+        raise click.BadParameter("must contain only letters and digits", param_hint='--prefix')
+    db = obj['db']
+    counts = seed.seed_database(db, users, rooms, members, votes, random_seed, password, prefix, batch_size)
+    print(", ".join(f"{name}: {count}" for name, count in counts.items()))
+
+
 @run_application.group('login', help="Login as existing user")
 @click.option("--login", required=True, help="Login of account you want to log in")
 @click.password_option()
@@ -43,6 +107,14 @@ def remove_user(obj, user):
     users.remove_user(db, user)
 
 
+@login.command('revoke_tokens', help="Revoke all refresh tokens of a user")
+@click.option("--user", required=True)
+@click.pass_obj
+def revoke_tokens(obj, user):
+    db = obj['db']
+    users.revoke_tokens(db, user)
+
+
 @login.command('create_room', help="Create new room")
 @click.password_option()
 @click.pass_obj
@@ -62,25 +134,45 @@ def delete_room(obj, room_id):
     rooms.delete_room(db, user.user_id, room_id)
 
 
+def export_options(command):
+    command = click.option('--chunk-size', type=click.IntRange(min=1), default=1000, show_default=True,
+                           help="Rows fetched and written at a time")(command)
+    command = click.option('--output', type=click.Path(dir_okay=False, writable=True),
+                           help="Write to this file instead of stdout")(command)
+    return click.option('--format', 'output_format', type=click.Choice(export.FORMATS), default='table',
+                        show_default=True, help="Output format; parquet needs pyarrow and --output")(command)
+
+
 @login.command('list_users', help="Shows all existing users in database")
 @click.option('--filter', help="Filters users by given characters")
+@click.option('--q', 'prefix', help="Shows users whose login starts with this")
+@click.option('--after', help="Shows users whose login sorts after this one (cursor)")
+@click.option('--limit', type=click.IntRange(min=1), help="Maximum number of users to show")
+@export_options
 @click.pass_obj
-def list_users(obj, filter=None):
+def list_users(obj, output_format, output, chunk_size, prefix, after, limit, filter=None):
     db = obj['db']
-    users_list = users.list_users(db, filter)
-    df = pd.DataFrame(users_list, columns=['ID', 'Login'])
-    print(df)
+    export.export(users.iter_users(db, filter, chunk_size, prefix, after, limit), export.USER_COLUMNS, output_format,
+                  output)
 
 
 @login.command('list_rooms', help="Shows all existing rooms in database")
 @click.option('--filter', help="Shows all rooms to which the given user belongs")
+@export_options
+@click.pass_obj
+def list_rooms(obj, output_format, output, chunk_size, filter=None):
+    db = obj['db']
+    export.export(rooms.iter_rooms(db, filter, chunk_size), export.ROOM_COLUMNS, output_format, output)
+
+
+@login.command('search_rooms', help="Full-text search over room names, topics and descriptions")
+@click.option('--q', 'text', required=True, help="Words to search for; the last one also matches as a prefix")
+@click.option('--limit', type=click.IntRange(min=1), default=20, show_default=True, help="Maximum number of rooms")
+@click.option('--offset', type=click.IntRange(min=0), default=0, show_default=True, help="Number of matches to skip")
 @click.pass_obj
-def list_rooms(obj, filter=None):
+def search_rooms(obj, text, limit, offset):
     db = obj['db']
-    rooms_list = rooms.list_rooms(db, filter)
-    print(rooms_list)
-    df = pd.DataFrame(rooms_list, columns=['ID', 'Name', 'Topic', 'Description', 'Users in room', 'Owner'])
-    print(df)
+    print_table(rooms.search_rooms(db, text, limit, offset), ['ID', 'Name', 'Topic', 'Owner'])
 
 
 @login.command('show_room', help="Show existing room")
@@ -91,11 +183,9 @@ def show_room(obj, room_id):
     user = obj['user']
     rooms_list = rooms.show_room(db, user.user_id, room_id)
     if rooms_list is not None:
-        df = pd.DataFrame(rooms_list, columns=['ID', 'Name', 'Topic', 'Description', 'Users in room', 'Owner'])
-        print(df)
+        print_table(rooms_list, ['ID', 'Name', 'Topic', 'Description', 'Users in room', 'Owner'])
         users_ratings = rooms.rating_of_room(db, room_id)
-        df = pd.DataFrame(users_ratings, columns=['User', 'Rating of Topic'])
-        print(df)
+        print_table(users_ratings, ['User', 'Rating of Topic'])
 
 
 @login.command('join_room', help="Join to existing room")
@@ -108,6 +198,25 @@ def join_room(obj, room_id, password):
     rooms.join_room(db, user.user_id, room_id, password)
 
 
+@login.command('create_invite', help="Create invite link to a room you own")
+@click.option('--room_id', required=True, type=int, help="Id of room you want to invite to")
+@click.option('--ttl', type=int, help="Seconds until the invite expires")
+@click.pass_obj
+def create_invite(obj, room_id, ttl):
+    db = obj['db']
+    user = obj['user']
+    rooms.create_invite(db, user.user_id, room_id, ttl)
+
+
+@login.command('accept_invite', help="Join room using an invite")
+@click.option('--invite', required=True, help="Invite created by the room owner")
+@click.pass_obj
+def accept_invite(obj, invite):
+    db = obj['db']
+    user = obj['user']
+    rooms.join_room_with_invite(db, user.user_id, invite)
+
+
 @login.command('leave_room', help="Leave room you are in")
 @click.option('--room_id', help="Id of room you want to leave")
 @click.pass_obj
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+import settings
+from database.database import after_commit, transaction
+
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES = ('vote_changed', 'member_joined', 'member_left', 'topic_changed', 'room_updated', 'room_deleted')
+
+
+class LocalEventBus:
+    """Delivers room events to handlers in this process only.
+
+    Handlers are called as ``handler(room_id, event)`` once the transaction
+    that produced the event commits, where ``event`` is a dict with at least
+    ``type``.
+    """
+
+    def __init__(self):
+        self.handlers = []
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, handler):
+        self.handlers.append(handler)
+
+    def unsubscribe(self, handler):
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+
+    def publish(self, db, room_id: int, event_type: str, **data):
+        self.publish_many(db, [(room_id, dict(type=event_type, **data))])
+
+    def publish_many(self, db, events: list):
+        self.published += len(events)
+        after_commit(db, lambda: self.dispatch(events))
+
+    def dispatch(self, events: list):
+        for room_id, event in events:
+            for handler in list(self.handlers):
+                handler(room_id, event)
+
+    async def start(self, db):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class SqliteEventBus(LocalEventBus):
+    """Shares room events between processes through the ``room_events`` table.
+
+    Publishing inserts the events in the caller's transaction and delivers
+    them locally after it commits; every process polls the table for rows written by other
+    processes and delivers those to its own handlers. Rows older than
+    ``retention`` seconds are pruned by both publishers and pollers, so CLI
+    writes don't grow the table when no server is running.
+    """
+
+    def __init__(self, interval_ms: int, retention: float):
+        super().__init__()
+        self.interval = interval_ms / 1000
+        self.retention = retention
+        self.origin = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.db = None
+        self._last_id = 0
+        self._last_cleanup = 0.0
+        self._running = False
+        self._task = None
+
+    def publish_many(self, db, events: list):
+        now = time.time()
+        with transaction(db):
+            db.exec_driver_sql("INSERT INTO room_events (origin, room_id, payload, created_at) VALUES (?, ?, ?, ?)",
+                               [(self.origin, room_id, json.dumps(event), now) for room_id, event in events])
+            self.prune(db)
+        super().publish_many(db, events)
+
+    def prune(self, db):
+        now = time.time()
+        if now - self._last_cleanup > self.retention:
+            self._last_cleanup = now
+            db.exec_driver_sql("DELETE FROM room_events WHERE created_at < ?", (now - self.retention,))
+
+    def fetch(self, db) -> list:
+        with transaction(db):
+            rows = db.exec_driver_sql("SELECT event_id, origin, room_id, payload FROM room_events "
+                                      "WHERE event_id > ? ORDER BY event_id", (self._last_id,)).fetchall()
+            self.prune(db)
+        if rows:
+            self._last_id = rows[-1][0]
+        return [(row[2], json.loads(row[3])) for row in rows if row[1] != self.origin]
+
+    async def poll(self):
+        async with self.db.connect() as conn:
+            events = await conn.run_sync(self.fetch)
+        self.received += len(events)
+        self.dispatch(events)
+
+    async def _run(self):
+        while self._running:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Room event poll failed")
+
+    async def start(self, db):
+        if self._task is not None:
+            return
+        self.db = db
+        async with db.connect() as conn:
+            self._last_id = (await conn.exec_driver_sql("SELECT COALESCE(MAX(event_id), 0) FROM room_events")).scalar()
+        self._running = True
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._running = False
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_bus(kind: str):
+    if kind == 'sqlite':
+        return SqliteEventBus(settings.EVENT_POLL_INTERVAL_MS, settings.EVENT_RETENTION)
+    return LocalEventBus()
+
+
+bus = create_bus(settings.EVENT_BUS)
@@ -0,0 +1,39 @@
+import base64
+import hashlib
+import hmac
+import time
+from typing import Optional
+
+import settings
+from database.rooms_model import Room
+
+
+def signature(room: Room, expires_at: int) -> str:
+    # The room's password hash is part of the signed message, so changing the
+    # password invalidates every invite issued before.
+    message = f'{room.id}.{expires_at}.{room.password}'.encode()
+    digest = hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def make_invite(room: Room, ttl: int) -> str:
+    expires_at = int(time.time()) + ttl
+    return f'{room.id}.{expires_at}.{signature(room, expires_at)}'
+
+
+def invite_room_id(token: str) -> Optional[int]:
+    try:
+        return int(token.split('.', 1)[0])
+    except ValueError:
+        return None
+
+
+def check_invite(room: Room, token: str) -> bool:
+    try:
+        room_id, expires_at, sig = token.split('.')
+        room_id, expires_at = int(room_id), int(expires_at)
+    except ValueError:
+        return False
+    if room_id != room.id or expires_at < time.time():
+        return False
+    return hmac.compare_digest(sig, signature(room, expires_at))
@@ -0,0 +1,92 @@
+from sqlalchemy import text
+
+from rooms import rooms_service
+from users import passwords
+
+
+async def get_room(db, room_id: int):
+    return await db.run_sync(rooms_service.get_room, room_id)
+
+
+async def get_room_by_name(db, name: str):
+    return await db.run_sync(rooms_service.get_room_by_name, name)
+
+
+async def create_room(db, owner_id: int, name: str, password: str):
+    hashed_psw = await passwords.hasher.hash(password)
+    await db.run_sync(rooms_service.insert_room, owner_id, name, hashed_psw)
+
+
+async def join_room(db, user_id: int, room_id: int, password: str) -> bool:
+    room = await db.run_sync(rooms_service.load_room, room_id)
+    if room is None or await db.run_sync(rooms_service.is_member, user_id, room_id):
+        return False
+    if not await passwords.hasher.check(password, room.password):
+        return False
+    await db.run_sync(rooms_service.add_member, user_id, room_id)
+    return True
+
+
+async def create_invite(db, user_id: int, room_id: int, ttl: int):
+    return await db.run_sync(rooms_service.create_invite, user_id, room_id, ttl)
+
+
+async def join_room_with_invite(db, user_id: int, room_id: int, token: str) -> bool:
+    return await db.run_sync(rooms_service.join_room_with_invite, user_id, room_id, token)
+
+
+async def leave_room(db, user_id: int, room_id: int) -> bool:
+    return await db.run_sync(rooms_service.leave_room, user_id, room_id)
+
+
+async def update_room(db, user_id: int, room_id: int, topic=None, desc=None, password=None) -> bool:
+    hashed_psw = None
+    if password is not None:
+        if not await db.run_sync(rooms_service.is_owner, user_id, room_id):
+            return False
+        hashed_psw = await passwords.hasher.hash(password)
+    return await db.run_sync(rooms_service.change_room, user_id, room_id, topic, desc, hashed_psw)
+
+
+async def update_rating_of_room(db, user_id: int, room_id: int, rating: float) -> bool:
+    return await db.run_sync(rooms_service.update_rating_of_room, user_id, room_id, rating)
+
+
+async def get_vote_summary(db, room_id: int):
+    return await db.run_sync(rooms_service.get_vote_summary, room_id)
+
+
+async def get_rating(db, user_id: int, room_id: int):
+    return await db.run_sync(rooms_service.get_rating, user_id, room_id)
+
+
+async def iter_room_votes(db, room_id: int, chunk_size: int = 500):
+    result = await db.stream(text("SELECT u.login, ur.topic_rating FROM user_room ur "
+                                  "JOIN users u ON u.user_id = ur.user_id "
+                                  "WHERE ur.room_id = :room_id ORDER BY ur.user_room_id"), {'room_id': room_id})
+    async for chunk in result.partitions(chunk_size):
+        yield chunk
+
+
+async def get_rooms_members(db, room_id=None, member_login=None):
+    return await db.run_sync(rooms_service.get_rooms_members, room_id, member_login)
+
+
+async def get_rooms_details(db, room_id=None, member_login=None):
+    return await db.run_sync(rooms_service.get_rooms_details, room_id, member_login)
+
+
+async def get_user_rooms(db, user_id: int, after: int = 0, limit: int = 100):
+    return await db.run_sync(rooms_service.get_user_rooms, user_id, after, limit)
+
+
+async def search_rooms(db, text: str, limit: int = 20, offset: int = 0):
+    return await db.run_sync(rooms_service.search_rooms, text, limit, offset)
+
+
+async def is_member(db, user_id: int, room_id: int):
+    return await db.run_sync(rooms_service.is_member, user_id, room_id)
+
+
+async def get_room_version(db, room_id: int):
+    return await db.run_sync(rooms_service.get_room_version, room_id)
@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+
+import settings
+
+KINDS = ('room', 'topic', 'members', 'votes')
+GENERATION_SLOTS = 1024
+
+
+class RoomCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._generations = [0] * GENERATION_SLOTS
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @staticmethod
+    def key(room_id):
+        try:
+            return int(room_id)
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, room_id, kind: str):
+        key = (self.key(room_id), kind)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def generation(self, room_id) -> int:
+        """Changes whenever the room is bumped or invalidated; pass it to ``set`` to drop fills that raced an update."""
+        room_key = self.key(room_id)
+        return self._generations[room_key % GENERATION_SLOTS] if room_key is not None else 0
+
+    def set(self, room_id, kind: str, value, generation=None):
+        room_key = self.key(room_id)
+        if room_key is None or value is None or self.maxsize <= 0:
+            return
+        if generation is not None and generation != self.generation(room_key):
+            return
+        key = (room_key, kind)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def bump(self, room_id):
+        room_key = self.key(room_id)
+        if room_key is not None:
+            self._generations[room_key % GENERATION_SLOTS] += 1
+
+    def invalidate(self, room_id, *kinds: str):
+        self.bump(room_id)
+        room_key = self.key(room_id)
+        for kind in kinds or KINDS:
+            self._entries.pop((room_key, kind), None)
+
+    def clear(self):
+        self._entries.clear()
+        self._generations = [generation + 1 for generation in self._generations]
+
+
+room_cache = RoomCache(settings.ROOM_CACHE_SIZE, settings.ROOM_CACHE_TTL)
@@ -1,67 +1,123 @@
-from typing import List, Union
-
-import bcrypt
+import json
+from typing import Dict, List, Union
 
+from database.database import transaction
 from database.rooms_model import Room, Topic
+from rooms import invites
+from rooms.events import bus
+from rooms.rooms_cache import room_cache
+from rooms.vote_summary import RATING_RE, VoteSummary
+from users import passwords
+
 
-RATING_RE = [0, 0.5, 1, 2, 3, 5, 8, 13, 20, 50, 100, 200, -1, -2]
+def insert_room(db, owner_id: int, name: str, hashed_psw: str):
+    with transaction(db):
+        out = db.exec_driver_sql("INSERT INTO rooms (owner_id, name, password) VALUES (?, ?, ?) RETURNING room_id", (owner_id, name, hashed_psw)).fetchone()[0]
+        db.exec_driver_sql("INSERT INTO user_room (user_id, room_id) VALUES (?, ?)", (owner_id, out))
+        db.exec_driver_sql("INSERT INTO topics (room_id, topic, topic_dsc) VALUES (?, ?, ?)", (out, 'None', 'None'))
 
 
 def create_room(db, owner_id: int, name: str, password: str):
-    salt = bcrypt.gensalt()
-    hashed_psw = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
-    with db.begin():
-        out = db.execute("INSERT INTO rooms (owner_id, name, password) VALUES (?, ?, ?) RETURNING room_id", (owner_id, name, hashed_psw)).fetchone()[0]
-        if not join_room(db, owner_id, out, password):
-            raise Exception("Owner could not join the room!")
-        db.execute("INSERT INTO topics (room_id, topic, topic_dsc) VALUES (?, ?, ?)", (out, 'None', 'None'))
+    insert_room(db, owner_id, name, passwords.hash_password(password))
 
 
-def get_room(db, room_id: int):
-    with db.begin():
-        db_room = db.execute("SELECT * FROM rooms WHERE room_id = ?", (room_id,)).fetchone()
+def load_room(db, room_id: int):
+    with transaction(db):
+        db_room = db.exec_driver_sql("SELECT * FROM rooms WHERE room_id = ?", (room_id,)).fetchone()
     if db_room is None:
         return None
     return Room(id=db_room[0], name=db_room[1], password=db_room[2], owner=db_room[3])
 
 
+def get_room(db, room_id: int):
+    room = room_cache.get(room_id, 'room')
+    if room is not None:
+        return room
+    generation = room_cache.generation(room_id)
+    room = load_room(db, room_id)
+    room_cache.set(room_id, 'room', room, generation)
+    return room
+
+
 def get_room_by_name(db, name: int):
-    with db.begin():
-        db_room = db.execute("SELECT * FROM rooms WHERE name = ?", (name,)).fetchone()
+    with transaction(db):
+        db_room = db.exec_driver_sql("SELECT * FROM rooms WHERE name = ?", (name,)).fetchone()
     if db_room is None:
         return None
     return Room(id=db_room[0], name=db_room[1], password=db_room[2], owner=db_room[3] )
 
 
 def delete_room_by_id(db, room_id: int):
-    with db.begin():
-        db.execute("DELETE FROM user_room WHERE room_id=?", (room_id,))
-        db.execute("DELETE FROM rooms WHERE room_id=?", (room_id,))
+    with transaction(db):
+        db.exec_driver_sql("DELETE FROM user_room WHERE room_id=?", (room_id,))
+        db.exec_driver_sql("DELETE FROM rooms WHERE room_id=?", (room_id,))
+        bus.publish(db, room_id, 'room_deleted')
+
+
+def bump_versions(db, room_ids):
+    db.exec_driver_sql("UPDATE rooms SET version = version + 1 WHERE room_id = ?",
+                       [(room_id,) for room_id in room_ids])
+
+
+def get_room_version(db, room_id: int):
+    with transaction(db):
+        return db.exec_driver_sql("SELECT version FROM rooms WHERE room_id = ?", (room_id,)).scalar()
+
+
+def add_member(db, user_id: int, room_id: int):
+    with transaction(db):
+        db.exec_driver_sql("INSERT INTO user_room (user_id, room_id) VALUES (?, ?)", (user_id, room_id))
+        bump_versions(db, [room_id])
+        bus.publish(db, room_id, 'member_joined', user_id=user_id)
 
 
 def join_room(db, user_id: int, room_id: int, password: str) -> bool:
-    with db.begin():
-        room = get_room(db, room_id)
-        if room is None:
-            return False
-        if not bcrypt.checkpw(password.encode('utf-8'), room.password.encode('utf-8')):
-            return False
-        db.execute("INSERT INTO user_room (user_id, room_id) VALUES (?, ?)", (user_id, room_id))
+    room = load_room(db, room_id)
+    if room is None or is_member(db, user_id, room_id):
+        return False
+    if not passwords.check_password(password, room.password):
+        return False
+    add_member(db, user_id, room_id)
+    return True
+
+
+def create_invite(db, user_id: int, room_id: int, ttl: int) -> Union[str, None]:
+    room = load_room(db, room_id)
+    if room is None or room.owner != user_id:
+        return None
+    return invites.make_invite(room, ttl)
+
+
+def join_room_with_invite(db, user_id: int, room_id: int, token: str) -> bool:
+    # Password changes made by another process reach this one's cache only
+    # after the event bus polls, so check against the stored hash.
+    room = load_room(db, room_id)
+    if room is None or not invites.check_invite(room, token):
+        return False
+    if is_member(db, user_id, room_id):
+        return False
+    add_member(db, user_id, room_id)
     return True
 
 
 def get_topic(db, room_id: int) -> Union[Topic, None]:
-    with db.begin():
-        topic = db.execute("SELECT * FROM topics WHERE room_id = ?", (room_id,)).fetchone()
+    cached = room_cache.get(room_id, 'topic')
+    if cached is not None:
+        return cached
+    generation = room_cache.generation(room_id)
+    with transaction(db):
+        topic = db.exec_driver_sql("SELECT * FROM topics WHERE room_id = ?", (room_id,)).fetchone()
     if topic is None:
         return None
 
-    return Topic(id=topic[0], room_id=topic[1], topic=topic[2], topic_dsc=topic[3])
+    cached = Topic(id=topic[0], room_id=topic[1], topic=topic[2], topic_dsc=topic[3])
+    room_cache.set(room_id, 'topic', cached, generation)
+    return cached
 
 
 def get_topic_by_id(db, topic_id: int) -> Union[Topic, None]:
-    with db.begin():
-        topic = db.execute("SELECT * FROM topics WHERE id = ?", (topic_id,)).fetchone()
+    with transaction(db):
+        topic = db.exec_driver_sql("SELECT * FROM topics WHERE id = ?", (topic_id,)).fetchone()
     if topic is None:
         return None
 
@@ -69,59 +125,115 @@ def get_topic_by_id(db, topic_id: int) -> Union[Topic, None]:
 
 
 def leave_room(db, user_id: int, room_id: int) -> bool:
-    with db.begin():
+    with transaction(db):
         room = get_room(db, room_id)
         joined_users = get_all_joined_users(db, room_id)
         if room is None:
             return False
         if user_id not in joined_users:
-            print(joined_users)
             return False
-        if user_id is room.owner:
+        if user_id == room.owner:
             return False
-        db.execute("DELETE FROM user_room WHERE user_id = ? AND room_id = ?", (user_id, room_id))
-        return True
+        db.exec_driver_sql("DELETE FROM user_room WHERE user_id = ? AND room_id = ?", (user_id, room_id))
+        bump_versions(db, [room_id])
+        bus.publish(db, room_id, 'member_left', user_id=user_id)
+    return True
+
 
+def is_member(db, user_id: int, room_id: int) -> bool:
+    return user_id in get_all_joined_users(db, room_id)
 
-def update_room(db, user_id: id, room_id: int, topic=None, desc=None, password=None) -> bool:
-    with db.begin():
+
+def is_owner(db, user_id: int, room_id: int) -> bool:
+    room = get_room(db, room_id)
+    return room is not None and room.owner == user_id
+
+
+def update_room(db, user_id: int, room_id: int, topic=None, desc=None, password=None) -> bool:
+    hashed_psw = None
+    if password is not None:
+        if not is_owner(db, user_id, room_id):
+            return False
+        hashed_psw = passwords.hash_password(password)
+    return change_room(db, user_id, room_id, topic, desc, hashed_psw)
+
+
+def change_room(db, user_id: int, room_id: int, topic=None, desc=None, hashed_psw=None) -> bool:
+    with transaction(db):
         room = get_room(db, room_id)
         if room is None:
             return False
         if user_id != room.owner:
             return False
         if topic is not None:
-            db.execute("UPDATE topics SET topic = ?, topic_dsc = ? WHERE room_id = ?", (topic, 'None', room_id))
-            db.execute("UPDATE user_room SET topic_rating = ? WHERE room_id = ?", (None, room_id))
+            db.exec_driver_sql("UPDATE topics SET topic = ?, topic_dsc = ? WHERE room_id = ?", (topic, 'None', room_id))
+            db.exec_driver_sql("UPDATE user_room SET topic_rating = ? WHERE room_id = ?", (None, room_id))
         if desc is not None:
-            db.execute("UPDATE topics SET topic_dsc = ? WHERE room_id = ?", (desc, room_id))
-        if password is not None:
-            salt = bcrypt.gensalt()
-            hashed_psw = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
-            db.execute("UPDATE rooms SET password = ? WHERE room_id = ?", (hashed_psw, room_id))
-        return True
+            db.exec_driver_sql("UPDATE topics SET topic_dsc = ? WHERE room_id = ?", (desc, room_id))
+        if hashed_psw is not None:
+            db.exec_driver_sql("UPDATE rooms SET password = ? WHERE room_id = ?", (hashed_psw, room_id))
+        if topic is not None or desc is not None or hashed_psw is not None:
+            bump_versions(db, [room_id])
+        if topic is not None or desc is not None:
+            bus.publish(db, room_id, 'topic_changed', topic=topic, desc=desc)
+        if hashed_psw is not None:
+            bus.publish(db, room_id, 'room_updated')
+    return True
 
 
-def update_rating_of_room(db, user_id: int, room_id: int, rating: float) -> bool:
-    with db.begin():
+def validate_rating(db, user_id: int, room_id: int, rating: float) -> bool:
+    with transaction(db):
         room = get_room(db, room_id)
         joined_users = get_all_joined_users(db, room_id)
-        room_topic = db.execute("SELECT * FROM topics WHERE room_id = ?", (room_id,)).fetchone()
-        if room is None:
-            return False
-        elif float(rating) not in RATING_RE:
-            return False
-        elif user_id not in joined_users:
-            return False
-        elif room_topic[2] is None:
+        room_topic = get_topic(db, room_id)
+    if room is None:
+        return False
+    elif float(rating) not in RATING_RE:
+        return False
+    elif user_id not in joined_users:
+        return False
+    elif room_topic is None or room_topic.topic is None:
+        return False
+    return True
+
+
+def apply_ratings(db, ratings: list) -> list:
+    results = []
+    with transaction(db):
+        for user_id, room_id, rating in ratings:
+            updated = db.exec_driver_sql("UPDATE user_room SET topic_rating = ? WHERE user_id = ? AND room_id = ?",
+                                         (rating, user_id, room_id)).rowcount
+            results.append(updated > 0)
+        events = [(room_id, {'type': 'vote_changed', 'user_id': user_id, 'rating': float(rating)})
+                  for (user_id, room_id, rating), updated in zip(ratings, results) if updated]
+        if events:
+            bump_versions(db, sorted({room_id for room_id, _ in events}))
+            bus.publish_many(db, events)
+    return results
+
+
+def update_rating_of_room(db, user_id: int, room_id: int, rating: float) -> bool:
+    with transaction(db):
+        if not validate_rating(db, user_id, room_id, rating):
             return False
-        db.execute("UPDATE user_room SET topic_rating = ? WHERE user_id = ? AND room_id = ?", (rating, user_id, room_id))
-        return True
+        return apply_ratings(db, [(user_id, room_id, rating)])[0]
+
+
+def get_vote_summary(db, room_id: int) -> VoteSummary:
+    summary = room_cache.get(room_id, 'votes')
+    if summary is not None:
+        return summary
+    generation = room_cache.generation(room_id)
+    with transaction(db):
+        rows = db.exec_driver_sql("SELECT user_id, topic_rating FROM user_room WHERE room_id = ?", (room_id,)).fetchall()
+    summary = VoteSummary(rows)
+    room_cache.set(room_id, 'votes', summary, generation)
+    return summary
 
 
 def get_rating(db, user_id: int, room_id):
-    with db.begin():
-        rating = db.execute("SELECT * FROM user_room WHERE user_id = ? AND room_id = ?", (user_id, room_id)).fetchone()
+    with transaction(db):
+        rating = db.exec_driver_sql("SELECT * FROM user_room WHERE user_id = ? AND room_id = ?", (user_id, room_id)).fetchone()
     if rating is None:
         return None
 
@@ -129,14 +241,123 @@ def get_rating(db, user_id: int, room_id):
 
 
 def get_all_rooms(db) -> List[Room]:
-    with db.begin():
-        return [Room(id=row[0], name=row[1], password=row[2], owner=row[3]) for row in db.execute("SELECT * FROM rooms")]
+    with transaction(db):
+        return [Room(id=row[0], name=row[1], password=row[2], owner=row[3]) for row in db.exec_driver_sql("SELECT * FROM rooms")]
+
+
+def _rooms_filter(column: str, room_id=None, member_login=None):
+    if room_id is not None:
+        return f" WHERE {column} = ?", (room_id,)
+    if member_login is not None:
+        return (f" WHERE {column} IN (SELECT ur.room_id FROM user_room ur JOIN users u ON u.user_id = ur.user_id "
+                f"WHERE u.login = ?)", (member_login,))
+    return "", ()
+
+
+def get_rooms_members(db, room_id=None, member_login=None) -> Dict[int, list]:
+    where, params = _rooms_filter("ur.room_id", room_id, member_login)
+    members = {}
+    with transaction(db):
+        rows = db.exec_driver_sql("SELECT ur.room_id, ur.user_id, u.login, ur.topic_rating FROM user_room ur "
+                                  "JOIN users u ON u.user_id = ur.user_id" + where + " ORDER BY ur.user_room_id",
+                                  params).fetchall()
+    for row in rows:
+        members.setdefault(row[0], []).append(row)
+    return members
+
+
+def get_rooms_details(db, room_id=None, member_login=None) -> list:
+    where, params = _rooms_filter("r.room_id", room_id, member_login)
+    with transaction(db):
+        rooms = db.exec_driver_sql("SELECT r.room_id, r.name, t.topic, t.topic_dsc, u.login FROM rooms r "
+                                   "LEFT JOIN topics t ON t.room_id = r.room_id "
+                                   "LEFT JOIN users u ON u.user_id = r.owner_id" + where + " ORDER BY r.room_id",
+                                   params).fetchall()
+        members = get_rooms_members(db, room_id, member_login)
+    rooms_list = []
+    for room in rooms:
+        user_list = sorted(member[2] for member in members.get(room[0], []))
+        rooms_list.append([room[0], room[1], room[2], room[3], user_list, room[4]])
+    return rooms_list
+
+
+def iter_rooms_details(db, member_login=None, chunk_size: int = 1000):
+    where, params = _rooms_filter("r.room_id", None, member_login)
+    with transaction(db):
+        result = db.execution_options(stream_results=True).exec_driver_sql(
+            "SELECT r.room_id, r.name, t.topic, t.topic_dsc, "
+            "(SELECT json_group_array(login) FROM (SELECT m.login FROM user_room ur JOIN users m "
+            "ON m.user_id = ur.user_id WHERE ur.room_id = r.room_id ORDER BY m.login)), u.login FROM rooms r "
+            "LEFT JOIN topics t ON t.room_id = r.room_id "
+            "LEFT JOIN users u ON u.user_id = r.owner_id" + where + " ORDER BY r.room_id", params)
+        for chunk in result.partitions(chunk_size):
+            yield [[row[0], row[1], row[2], row[3], json.loads(row[4]), row[5]] for row in chunk]
+
+
+def fts_query(text: str) -> str:
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_rooms(db, text: str, limit: int = 20, offset: int = 0) -> list:
+    query = fts_query(text)
+    if not query:
+        return []
+    with transaction(db):
+        return db.exec_driver_sql("SELECT r.room_id, r.name, t.topic, u.login FROM (SELECT rowid, rank FROM rooms_search "
+                                  "WHERE rooms_search MATCH ? AND rank MATCH 'bm25(10.0, 5.0, 1.0)' "
+                                  "ORDER BY rank LIMIT ? OFFSET ?) s "
+                                  "JOIN rooms r ON r.room_id = s.rowid "
+                                  "LEFT JOIN topics t ON t.room_id = r.room_id "
+                                  "LEFT JOIN users u ON u.user_id = r.owner_id ORDER BY s.rank, s.rowid",
+                                  (query, limit, offset)).fetchall()
+
+
+def get_user_rooms(db, user_id: int, after: int = 0, limit: int = 100) -> list:
+    with transaction(db):
+        return db.exec_driver_sql("SELECT r.room_id, r.name, u.login FROM user_room ur "
+                                  "JOIN rooms r ON r.room_id = ur.room_id "
+                                  "JOIN users u ON u.user_id = r.owner_id "
+                                  "WHERE ur.user_id = ? AND ur.room_id > ? ORDER BY ur.room_id LIMIT ?",
+                                  (user_id, after, limit)).fetchall()
 
 
 def get_all_joined_users(db, room_id: int):
-    with db.begin():
-        user_room_joined = db.execute("SELECT * FROM user_room WHERE room_id = ?", (room_id,)).fetchall()
-    users_in_room = []
-    for row in user_room_joined:
-        users_in_room.append(row[1])
+    users_in_room = room_cache.get(room_id, 'members')
+    if users_in_room is not None:
+        return users_in_room
+    generation = room_cache.generation(room_id)
+    with transaction(db):
+        user_room_joined = db.exec_driver_sql("SELECT user_id FROM user_room WHERE room_id = ?", (room_id,)).fetchall()
+    users_in_room = frozenset(row[0] for row in user_room_joined)
+    room_cache.set(room_id, 'members', users_in_room, generation)
     return users_in_room
+
+
+def apply_event(room_id: int, event: dict):
+    if event['type'] == 'vote_changed':
+        room_cache.bump(room_id)
+        summary = room_cache.get(room_id, 'votes')
+        if summary is not None:
+            summary.set_vote(event['user_id'], event['rating'])
+    elif event['type'] in ('member_joined', 'member_left'):
+        room_cache.invalidate(room_id, 'members')
+        summary = room_cache.get(room_id, 'votes')
+        if summary is not None and event['type'] == 'member_joined':
+            summary.add_member(event['user_id'])
+        elif summary is not None:
+            summary.remove_member(event['user_id'])
+    elif event['type'] == 'topic_changed':
+        room_cache.invalidate(room_id, 'topic')
+        summary = room_cache.get(room_id, 'votes')
+        if summary is not None and event['topic'] is not None:
+            summary.reset()
+    elif event['type'] == 'room_updated':
+        room_cache.invalidate(room_id, 'room')
+    elif event['type'] == 'room_deleted':
+        room_cache.invalidate(room_id)
+
+
+bus.subscribe(apply_event)
@@ -0,0 +1,72 @@
+import asyncio
+
+from rooms import rooms_service
+
+
+class VoteBatcher:
+    """Collects validated votes and writes them in one transaction per flush.
+
+    A flush happens every ``interval_ms`` milliseconds, or as soon as
+    ``batch_size`` votes are waiting, whichever comes first.
+    """
+
+    def __init__(self, db, interval_ms: int, batch_size: int):
+        self.db = db
+        self.interval = interval_ms / 1000
+        self.batch_size = batch_size
+        self.flushes = 0
+        self.flushed_votes = 0
+        self._pending = []
+        self._full = asyncio.Event()
+        self._running = False
+        self._task = None
+
+    async def submit(self, user_id: int, room_id: int, rating: float) -> bool:
+        async with self.db.connect() as conn:
+            if not await conn.run_sync(rooms_service.validate_rating, user_id, room_id, rating):
+                return False
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(((user_id, room_id, rating), future))
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        return await future
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        self._full.clear()
+        if not batch:
+            return
+        try:
+            async with self.db.connect() as conn:
+                results = await conn.run_sync(rooms_service.apply_ratings, [vote for vote, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.flushes += 1
+        self.flushed_votes += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run(self):
+        while self._running:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._running = True
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._running = False
+            self._full.set()
+            await self._task
+            self._task = None
+        await self.flush()
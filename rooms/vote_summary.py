@@ -0,0 +1,91 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+RATING_RE = [0, 0.5, 1, 2, 3, 5, 8, 13, 20, 50, 100, 200, -1, -2]
+NUMERIC_RATINGS = sorted(rating for rating in RATING_RE if rating >= 0)
+
+
+class VoteSummary:
+    """Per-room vote aggregates, updated one vote at a time.
+
+    Negative ratings are special cards (-1, -2) and are counted in the
+    histogram but left out of the mean, median and mode.
+    """
+
+    def __init__(self, members: Iterable[Tuple[int, Optional[float]]]):
+        self.votes: Dict[int, Optional[float]] = {}
+        self.histogram = {rating: 0 for rating in RATING_RE}
+        self.voters = 0
+        self.numeric_voters = 0
+        self.numeric_sum = 0.0
+        for user_id, rating in members:
+            self.add_member(user_id)
+            self.set_vote(user_id, rating)
+
+    @property
+    def members(self) -> int:
+        return len(self.votes)
+
+    def add_member(self, user_id: int):
+        self.votes.setdefault(user_id, None)
+
+    def remove_member(self, user_id: int):
+        self._count(self.votes.pop(user_id, None), -1)
+
+    def set_vote(self, user_id: int, rating: Optional[float]):
+        rating = None if rating is None else float(rating)
+        self._count(self.votes.get(user_id), -1)
+        self.votes[user_id] = rating
+        self._count(rating, 1)
+
+    def reset(self):
+        for user_id in self.votes:
+            self.votes[user_id] = None
+        self.histogram = {rating: 0 for rating in RATING_RE}
+        self.voters = 0
+        self.numeric_voters = 0
+        self.numeric_sum = 0.0
+
+    def _count(self, rating: Optional[float], step: int):
+        if rating is None:
+            return
+        self.histogram[_rating_key(rating)] += step
+        self.voters += step
+        if rating >= 0:
+            self.numeric_voters += step
+            self.numeric_sum += step * rating
+
+    def median(self) -> Optional[float]:
+        if self.numeric_voters == 0:
+            return None
+        lower = upper = None
+        seen = 0
+        for rating in NUMERIC_RATINGS:
+            seen += self.histogram[rating]
+            if lower is None and seen >= (self.numeric_voters + 1) // 2:
+                lower = rating
+            if seen >= self.numeric_voters // 2 + 1:
+                upper = rating
+                break
+        return (lower + upper) / 2
+
+    def mode(self) -> Optional[float]:
+        best = max(NUMERIC_RATINGS, key=lambda rating: self.histogram[rating])
+        return best if self.histogram[best] > 0 else None
+
+    def as_dict(self) -> dict:
+        return {
+            "members": self.members,
+            "voters": self.voters,
+            "all_voted": self.members > 0 and self.voters == self.members,
+            "histogram": {str(rating): count for rating, count in self.histogram.items()},
+            "mean": self.numeric_sum / self.numeric_voters if self.numeric_voters else None,
+            "median": self.median(),
+            "mode": self.mode(),
+        }
+
+
+def _rating_key(rating: float):
+    for value in RATING_RE:
+        if value == rating:
+            return value
+    raise ValueError(f"Rating {rating} is not allowed")
@@ -1,23 +1,98 @@
+import contextlib
+import os
+
 import uvicorn
 from starlette.applications import Starlette
 from starlette.middleware import Middleware
 from starlette.middleware.authentication import AuthenticationMiddleware
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 from starlette.middleware.trustedhost import TrustedHostMiddleware
-from starlette.routing import Mount
-from starlette_jwt import JWTAuthenticationBackend
+from starlette.requests import Request
+from starlette.routing import Mount, Route
+from starlette_jwt import JWTAuthenticationBackend, JWTWebSocketAuthenticationBackend, TokenCache
+
+import settings
 
+from commands import db
+from database import migrations
 from server import api
+from server.api.rooms.hub import hub
+from rooms.events import bus
+from rooms.vote_batcher import VoteBatcher
+from server import metrics
+from server.authentication import LenientPathsBackend
+from server.profiling import ProfilingMiddleware
+from server.request_metrics import RequestMetrics, RequestMetricsMiddleware
+from server.responses import JSONResponse
+from users import passwords
+
+
+async def hasher_busy(request: Request, exc: passwords.HasherBusy):
+    return JSONResponse({"error": "server_busy"}, status_code=503, headers={"Retry-After": "1"})
 
 
-def run():
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    app.state.db = db.get_async_database()
+    async with app.state.db.connect() as conn:
+        version = await conn.run_sync(migrations.get_version)
+    if version < migrations.latest_version():
+        await app.state.db.dispose()
+        raise RuntimeError(f"Database schema is at version {version}, expected {migrations.latest_version()}; "
+                           "run `python main.py migrate` first")
+    await bus.start(app.state.db)
+    hub.start(app.state.db)
+    app.state.vote_batcher = None
+    if settings.VOTE_BATCHING:
+        app.state.vote_batcher = VoteBatcher(app.state.db, settings.VOTE_BATCH_INTERVAL_MS, settings.VOTE_BATCH_SIZE)
+        app.state.vote_batcher.start()
+    try:
+        yield
+    finally:
+        if app.state.vote_batcher is not None:
+            await app.state.vote_batcher.stop()
+        await hub.stop()
+        await bus.stop()
+        passwords.hasher.shutdown()
+        await app.state.db.dispose()
+
+
+def create_app():
     routes = [
         Mount("/api", routes=api.routes, name="api"),
+        Route("/metrics", endpoint=metrics.metrics, methods=['GET']),
     ]
+    token_cache = TokenCache(maxsize=settings.JWT_CACHE_SIZE)
+    request_metrics = RequestMetrics()
     middleware = [
+        Middleware(RequestMetricsMiddleware, metrics=request_metrics),
         Middleware(TrustedHostMiddleware, allowed_hosts=['*']),
         Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
-        Middleware(AuthenticationMiddleware, backend=JWTAuthenticationBackend(secret_key='secret'))
+        Middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_SIZE),
+        Middleware(AuthenticationMiddleware,
+                   backend=LenientPathsBackend(JWTAuthenticationBackend(secret_key=settings.SECRET_KEY,
+                                                                        cache=token_cache),
+                                               paths=['/api/users/refresh']))
     ]
-    app = Starlette(debug=True, routes=routes, middleware=middleware)
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    if settings.PROFILING:
+        middleware.insert(1, Middleware(ProfilingMiddleware, directory=settings.PROFILE_DIR))
+    app = Starlette(debug=settings.DEBUG, routes=routes, middleware=middleware,
+                    exception_handlers={passwords.HasherBusy: hasher_busy}, lifespan=lifespan)
+    app.state.request_metrics = request_metrics
+    app.state.token_cache = token_cache
+    app.state.websocket_auth = JWTWebSocketAuthenticationBackend(secret_key=settings.SECRET_KEY, cache=token_cache)
+    return app
+
+
+def run(host=settings.HOST, port=settings.PORT, workers=settings.WORKERS, loop='auto', http='auto',
+        timeout_keep_alive=5):
+    # Workers read settings on import; this lets them size their bcrypt pools.
+    os.environ['ROOMS_WORKERS'] = str(workers)
+    sync_db = db.get_database()
+    applied = migrations.migrate(sync_db)
+    sync_db.dispose()
+    if applied:
+        print("Applied migrations: " + ", ".join(str(version) for version in applied))
+    uvicorn.run("server:create_app", factory=True, host=host, port=port, workers=workers, loop=loop, http=http,
+                timeout_keep_alive=timeout_keep_alive)
@@ -1,14 +1,19 @@
-from starlette.routing import Route
+from starlette.routing import Route, WebSocketRoute
 
 from server.api.rooms import endpoints
 
 routes = [
     Route('/my', endpoint=endpoints.ListRooms, methods=['GET']),
     Route('/create', endpoint=endpoints.CreateRoom, methods=['POST']),
+    Route('/search', endpoint=endpoints.SearchRooms, methods=['GET']),
     Route('/{id:int}', endpoint=endpoints.ShowRoom, methods=['GET']),
     Route('/{id:int}', endpoint=endpoints.UpdateRoom, methods=['PATCH']),
     Route('/{id:int}/join', endpoint=endpoints.JoinRoom, methods=['POST']),
+    Route('/{id:int}/invite', endpoint=endpoints.CreateInvite, methods=['POST']),
+    Route('/{id:int}/leave', endpoint=endpoints.LeaveRoom, methods=['POST']),
     Route('/{id:int}/vote', endpoint=endpoints.ShowVotes, methods=['GET']),
     Route('/{id:int}/vote', endpoint=endpoints.VoteTopic, methods=['PUT']),
+    Route('/{id:int}/vote/summary', endpoint=endpoints.ShowVoteSummary, methods=['GET']),
+    WebSocketRoute('/{id:int}/ws', endpoint=endpoints.RoomSocket),
 
 ]
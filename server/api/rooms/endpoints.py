@@ -1,23 +1,59 @@
-from starlette.authentication import requires
-from starlette.endpoints import HTTPEndpoint
+from starlette import status
+from starlette.authentication import AuthenticationError, requires
+from starlette.endpoints import HTTPEndpoint, WebSocketEndpoint
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import Response
+from starlette.websockets import WebSocket
 
-from commands import db
 from commands import rooms
+from server.api.rooms.hub import hub
+from server.responses import JSONResponse, StreamingJSONArray
 
-db = db.get_database()
+MAX_PAGE_SIZE = 500
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    tags = [tag.strip() for tag in request.headers.get('if-none-match', '').split(',')]
+    return '*' in tags or etag in tags or 'W/' + etag in tags
 
 
 class ListRooms(HTTPEndpoint):
     @requires("authenticated")
     async def get(self, request: Request):
-        logged_user = request.user.username
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = min(int(request.query_params.get('limit', 100)), MAX_PAGE_SIZE)
+        except ValueError:
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
+        if limit < 1:
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
         rooms_list = []
-        my_rooms = rooms.list_rooms(db, logged_user)
-        for one_room in my_rooms:
-            rooms_list.append({"name": one_room[1], "id": one_room[0], "owner": one_room[5]})
-        return JSONResponse(content=rooms_list, status_code=200)
+        my_rooms = await rooms.list_user_rooms_async(request.app.state.db, request.user.sub, after, limit + 1)
+        for one_room in my_rooms[:limit]:
+            rooms_list.append({"name": one_room[1], "id": one_room[0], "owner": one_room[2]})
+        headers = {}
+        if len(my_rooms) > limit:
+            headers['X-Next-Cursor'] = str(rooms_list[-1]["id"])
+        return JSONResponse(content=rooms_list, status_code=200, headers=headers)
+
+
+class SearchRooms(HTTPEndpoint):
+    @requires("authenticated")
+    async def get(self, request: Request):
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), MAX_PAGE_SIZE)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
+        if limit < 1 or offset < 0:
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
+        found = await rooms.search_rooms_async(request.app.state.db, request.query_params.get('q', ''), limit + 1,
+                                               offset)
+        rooms_list = [{"name": room[1], "id": room[0], "topic": room[2], "owner": room[3]} for room in found[:limit]]
+        headers = {}
+        if len(found) > limit:
+            headers['X-Next-Offset'] = str(offset + limit)
+        return JSONResponse(content=rooms_list, status_code=200, headers=headers)
 
 
 class CreateRoom(HTTPEndpoint):
@@ -26,7 +62,7 @@ class CreateRoom(HTTPEndpoint):
         data = await request.json()
         name = data["name"]
         password = data['password']
-        rooms.create_room(db, request.user.sub, name, password)
+        await rooms.create_room_async(request.app.state.db, request.user.sub, name, password)
         return JSONResponse({}, status_code=200)
 
 
@@ -35,8 +71,40 @@ class JoinRoom(HTTPEndpoint):
     async def post(self, request: Request):
         data = await request.json()
         room_id = request.path_params['id']
+        if 'invite' in data:
+            if not await rooms.join_room_with_invite_async(request.app.state.db, request.user.sub, room_id,
+                                                           str(data['invite'])):
+                return JSONResponse({"error": "invalid_invite"}, status_code=403)
+            return JSONResponse({}, status_code=200)
         password = data['password']
-        rooms.join_room(db, request.user.sub, room_id, password)
+        if not await rooms.join_room_async(request.app.state.db, request.user.sub, room_id, password):
+            return JSONResponse({"error": "invalid_password"}, status_code=403)
+        return JSONResponse({}, status_code=200)
+
+
+class CreateInvite(HTTPEndpoint):
+    @requires("authenticated")
+    async def post(self, request: Request):
+        try:
+            data = await request.json() if await request.body() else {}
+            ttl = int(data.get('ttl', 0))
+        except (ValueError, TypeError, AttributeError):
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
+        if ttl < 0:
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
+        room_id = request.path_params['id']
+        token = await rooms.create_invite_async(request.app.state.db, request.user.sub, room_id, ttl)
+        if token is None:
+            return JSONResponse({"error": "not_owner"}, status_code=403)
+        return JSONResponse({"invite": token}, status_code=200)
+
+
+class LeaveRoom(HTTPEndpoint):
+    @requires("authenticated")
+    async def post(self, request: Request):
+        room_id = request.path_params['id']
+        if not await rooms.leave_room_async(request.app.state.db, request.user.sub, room_id):
+            return JSONResponse({"error": "not_in_room"}, status_code=400)
         return JSONResponse({}, status_code=200)
 
 
@@ -48,28 +116,45 @@ class UpdateRoom(HTTPEndpoint):
         room_id = request.path_params['id']
         if 'topic' in data:
             topic = data['topic']
-            rooms.change_topic(db, request.user.sub, room_id, topic, None)
+            await rooms.change_topic_async(request.app.state.db, request.user.sub, room_id, topic, None)
         if 'password' in data:
             password = data['password']
-            rooms.change_pass(db, request.user.sub, room_id, password)
-        room = rooms.show_room(db, user_id, room_id)
+            await rooms.change_pass_async(request.app.state.db, request.user.sub, room_id, password)
+        version = await rooms.room_version_async(request.app.state.db, room_id, user_id)
+        if version is None:
+            return JSONResponse({"error": "not_in_room"}, status_code=403)
+        room = await rooms.room_details_async(request.app.state.db, room_id)
         users_dict = []
         for user in room[0][4]:
             users_dict.append({"username": user})
         return JSONResponse(content={"name": room[0][1], "id": room[0][0], "topic": room[0][2], "users": users_dict},
-                            status_code=200)
+                            status_code=200, headers={"ETag": f'"{version}"'})
 
 
 class ShowVotes(HTTPEndpoint):
     @requires("authenticated")
     async def get(self, request: Request):
         room_id = request.path_params['id']
-        room_rating = rooms.rating_of_room(db, room_id)
-        votes = []
-        for user in room_rating:
-            votes.append({"username": user[0], "value": user[1]})
-        return JSONResponse(content={"votes": votes},
-                            status_code=200)
+        version = await rooms.room_version_async(request.app.state.db, room_id)
+        headers = {}
+        if version is not None:
+            headers['ETag'] = f'"{version}"'
+            if etag_matches(request, headers['ETag']):
+                return Response(status_code=304, headers=headers)
+
+        async def votes():
+            async for chunk in rooms.iter_votes_async(request.app.state.db, room_id):
+                yield [{"username": user[0], "value": user[1]} for user in chunk]
+
+        return StreamingJSONArray(votes(), key="votes", status_code=200, headers=headers)
+
+
+class ShowVoteSummary(HTTPEndpoint):
+    @requires("authenticated")
+    async def get(self, request: Request):
+        room_id = request.path_params['id']
+        summary = await rooms.vote_summary_async(request.app.state.db, room_id)
+        return JSONResponse(content=summary, status_code=200)
 
 
 class VoteTopic(HTTPEndpoint):
@@ -79,7 +164,7 @@ class VoteTopic(HTTPEndpoint):
         vote = data["vote"]
         room_id = request.path_params['id']
         user_id = request.user.sub
-        rooms.rate_topic(db, user_id, room_id, vote)
+        await rooms.rate_topic_async(request.app.state.db, user_id, room_id, vote, request.app.state.vote_batcher)
         return JSONResponse(content={},
                             status_code=200)
 
@@ -89,9 +174,48 @@ class ShowRoom(HTTPEndpoint):
     async def get(self, request: Request):
         room_id = request.path_params['id']
         user_id = request.user.sub
-        room = rooms.show_room(db, user_id, room_id)
+        version = await rooms.room_version_async(request.app.state.db, room_id, user_id)
+        if version is None:
+            return JSONResponse({"error": "not_in_room"}, status_code=403)
+        etag = f'"{version}"'
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        room = await rooms.room_details_async(request.app.state.db, room_id)
         users_dict = []
         for user in room[0][4]:
             users_dict.append({"username": user})
         return JSONResponse(content={"name": room[0][1], "id": room[0][0], "topic": room[0][2], "users": users_dict},
-                            status_code=200)
+                            status_code=200, headers={"ETag": etag})
+
+
+class RoomSocket(WebSocketEndpoint):
+    encoding = 'json'
+
+    async def on_connect(self, websocket: WebSocket):
+        room_id = websocket.path_params['id']
+        try:
+            _, user = await websocket.app.state.websocket_auth.authenticate(websocket)
+        except AuthenticationError:
+            user = None
+        if user is None or not user.is_authenticated:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        # Subscribe before reading the snapshot so no change falls between the two;
+        # the hub holds deltas back until the snapshot has been sent.
+        hub.subscribe(room_id, websocket, user.sub)
+        room = await rooms.show_room_async(websocket.app.state.db, user.sub, room_id)
+        if room is None:
+            hub.unsubscribe(room_id, websocket)
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        await websocket.accept()
+        room_rating = await rooms.rating_of_room_async(websocket.app.state.db, room_id)
+        await websocket.send_json({"type": "snapshot",
+                                   "room": {"name": room[0][1], "id": room[0][0], "topic": room[0][2],
+                                            "users": [{"username": user} for user in room[0][4]]},
+                                   "votes": [{"username": user[0], "value": user[1]} for user in room_rating]})
+        if not await hub.ready(websocket):
+            await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+
+    async def on_disconnect(self, websocket: WebSocket, close_code: int):
+        hub.unsubscribe(websocket.path_params['id'], websocket)
@@ -0,0 +1,103 @@
+import asyncio
+
+from starlette import status
+from starlette.websockets import WebSocket
+
+from rooms.events import bus
+from users import users_async_service
+
+
+class RoomHub:
+    def __init__(self):
+        self.rooms = {}
+        self.pending = {}
+        self.db = None
+        self._tasks = set()
+
+    def start(self, db):
+        self.db = db
+        bus.subscribe(self.on_event)
+
+    async def stop(self):
+        bus.unsubscribe(self.on_event)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def subscribe(self, room_id: int, websocket: WebSocket, user_id: int):
+        """Subscribes ``websocket``, holding its messages back until ``ready`` is awaited."""
+        self.pending[websocket] = []
+        self.rooms.setdefault(room_id, {})[websocket] = user_id
+
+    async def ready(self, websocket: WebSocket) -> bool:
+        """Sends the messages held back since ``subscribe`` and delivers later ones directly.
+
+        Returns False if the socket was dropped meanwhile; the caller should close it.
+        """
+        buffer = self.pending.get(websocket)
+        while buffer:
+            await websocket.send_json(buffer.pop(0))
+        return self.pending.pop(websocket, None) is not None
+
+    def unsubscribe(self, room_id: int, websocket: WebSocket):
+        self.pending.pop(websocket, None)
+        sockets = self.rooms.get(room_id)
+        if sockets is None:
+            return
+        sockets.pop(websocket, None)
+        if not sockets:
+            del self.rooms[room_id]
+
+    async def close(self, room_id: int, user_id=None):
+        """Unsubscribes and closes the room's sockets, only those of ``user_id`` if given."""
+        sockets = [websocket for websocket, owner in self.rooms.get(room_id, {}).items()
+                   if user_id is None or owner == user_id]
+        # Sockets still waiting for their snapshot are closed by ``ready``'s caller.
+        opened = [websocket for websocket in sockets if websocket not in self.pending]
+        for websocket in sockets:
+            self.unsubscribe(room_id, websocket)
+        await asyncio.gather(*(websocket.close(code=status.WS_1000_NORMAL_CLOSURE) for websocket in opened),
+                             return_exceptions=True)
+
+    async def publish(self, room_id: int, message: dict):
+        sockets = []
+        for websocket in self.rooms.get(room_id, ()):
+            if websocket in self.pending:
+                self.pending[websocket].append(message)
+            else:
+                sockets.append(websocket)
+        results = await asyncio.gather(*(websocket.send_json(message) for websocket in sockets),
+                                       return_exceptions=True)
+        for websocket, result in zip(sockets, results):
+            if isinstance(result, Exception):
+                self.unsubscribe(room_id, websocket)
+
+    def on_event(self, room_id: int, event: dict):
+        if room_id not in self.rooms:
+            return
+        task = asyncio.get_running_loop().create_task(self.forward(room_id, event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def forward(self, room_id: int, event: dict):
+        if event['type'] == 'topic_changed':
+            if event['topic'] is not None:
+                await self.publish(room_id, {"type": "topic_changed", "topic": event['topic']})
+        elif event['type'] == 'room_deleted':
+            await self.publish(room_id, {"type": "room_deleted"})
+            await self.close(room_id)
+        elif event['type'] in ('member_joined', 'member_left', 'vote_changed'):
+            # Events for deleted users carry the login, which can no longer be looked up.
+            username = event.get('login')
+            if username is None:
+                async with self.db.connect() as conn:
+                    user = await users_async_service.get_user(conn, event['user_id'])
+                username = user.login if user is not None else None
+            if event['type'] == 'vote_changed':
+                await self.publish(room_id, {"type": "vote", "username": username, "value": event['rating']})
+            else:
+                await self.publish(room_id, {"type": event['type'], "username": username})
+            if event['type'] == 'member_left':
+                await self.close(room_id, event['user_id'])
+
+
+hub = RoomHub()
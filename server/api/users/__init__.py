@@ -6,5 +6,6 @@ routes = [
     Route('/register', endpoint=endpoints.Register, methods=['POST']),
     Route('/login', endpoint=endpoints.Login, methods=['POST']),
     Route('/refresh', endpoint=endpoints.Refresh, methods=['POST']),
+    Route('/logout', endpoint=endpoints.Logout, methods=['POST']),
     Route('/list', endpoint=endpoints.ListUsers, methods=['GET'])
 ]
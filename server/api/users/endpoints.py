@@ -4,23 +4,40 @@ import jwt
 from starlette.authentication import requires
 from starlette.endpoints import HTTPEndpoint
 from starlette.requests import Request
-from starlette.responses import JSONResponse
 
-from commands import db
+import settings
 from commands import users
+from server.responses import JSONResponse
 
-db = db.get_database()
-key = 'secret'
+MAX_PAGE_SIZE = 500
+
+
+def access_token(user_id: int, username: str) -> str:
+    payload = {"sub": user_id,
+               "username": username,
+               "exp": datetime.datetime.now(tz=datetime.timezone.utc)
+               + datetime.timedelta(minutes=settings.ACCESS_TOKEN_MINUTES)}
+    return jwt.encode(payload=payload, key=settings.SECRET_KEY, algorithm='HS256')
 
 
 class ListUsers(HTTPEndpoint):
     @requires("authenticated")
     async def get(self, request: Request):
+        try:
+            limit = min(int(request.query_params.get('limit', 100)), MAX_PAGE_SIZE)
+        except ValueError:
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
+        if limit < 1:
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
         user_list = []
-        user = users.list_users(db)
-        for name in user:
+        user = await users.list_users_async(request.app.state.db, request.query_params.get('q'),
+                                            request.query_params.get('after'), limit + 1)
+        for name in user[:limit]:
             user_list.append({"username": name[1]})
-        return JSONResponse(content=user_list)
+        headers = {}
+        if len(user) > limit:
+            headers['X-Next-Cursor'] = user_list[-1]["username"]
+        return JSONResponse(content=user_list, headers=headers)
 
 
 class Register(HTTPEndpoint):
@@ -31,7 +48,7 @@ class Register(HTTPEndpoint):
             return JSONResponse({"error": "wrong_data"}, status_code=400)
         user_login = data['login']
         password = data['password']
-        user_data = users.register_user(db, user_login, password)
+        user_data = await users.register_user_async(request.app.state.db, user_login, password)
         if user_data == 'err_wrong_data':
             return JSONResponse({"error": "wrong_data"}, status_code=400)
         elif user_data == 'err_user_exists':
@@ -48,24 +65,40 @@ class Login(HTTPEndpoint):
             return JSONResponse({"error": "wrong_data"}, status_code=400)
         user_login = data['login']
         password = data['password']
-        user_data = users.login(db, user_login, password)
+        user_data = await users.login_async(request.app.state.db, user_login, password)
         if user_data == 'err_wrong_credentials':
             return JSONResponse({}, status_code=401)
-        else:
-            payload = {"sub": user_data.user_id,
-                       "username": user_data.login,
-                       "exp": datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(minutes=15)}
-            token = jwt.encode(payload=payload,
-                               key=key, algorithm='HS256')
-            return JSONResponse({'token': token}, status_code=200)
+        refresh_token = await users.issue_refresh_token_async(request.app.state.db, user_data.user_id)
+        return JSONResponse({'token': access_token(user_data.user_id, user_data.login),
+                             'refresh_token': refresh_token}, status_code=200)
 
 
 class Refresh(HTTPEndpoint):
-    @requires("authenticated")
     async def post(self, request: Request):
-        payload = {"sub": request.user.sub,
-                   "username": request.user.username,
-                   "exp": datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(minutes=15)}
-        token = jwt.encode(payload=payload,
-                           key=key, algorithm='HS256')
-        return JSONResponse({'token': token}, status_code=200)
+        try:
+            data = await request.json() if await request.body() else {}
+        except ValueError:
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
+        if not isinstance(data, dict):
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
+        if data.get('refresh_token') is None:
+            if not request.user.is_authenticated:
+                return JSONResponse({}, status_code=403)
+            return JSONResponse({'token': access_token(request.user.sub, request.user.username)}, status_code=200)
+        result = await users.refresh_async(request.app.state.db, str(data['refresh_token']))
+        if result == 'err_invalid_token':
+            return JSONResponse({"error": "invalid_token"}, status_code=401)
+        user, refresh_token = result
+        return JSONResponse({'token': access_token(user.user_id, user.login),
+                             'refresh_token': refresh_token}, status_code=200)
+
+
+class Logout(HTTPEndpoint):
+    async def post(self, request: Request):
+        try:
+            data = await request.json()
+            refresh_token = str(data['refresh_token'])
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse({"error": "wrong_data"}, status_code=400)
+        await users.logout_async(request.app.state.db, refresh_token)
+        return JSONResponse({}, status_code=200)
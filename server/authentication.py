@@ -0,0 +1,21 @@
+from starlette.authentication import AuthenticationBackend, AuthenticationError
+
+
+class LenientPathsBackend(AuthenticationBackend):
+    """Wraps ``backend`` so requests to ``paths`` with a bad or expired token are unauthenticated instead of rejected.
+
+    Lets clients renew an expired access token with a refresh token while
+    still sending the old ``Authorization`` header.
+    """
+
+    def __init__(self, backend: AuthenticationBackend, paths):
+        self.backend = backend
+        self.paths = frozenset(paths)
+
+    async def authenticate(self, conn):
+        try:
+            return await self.backend.authenticate(conn)
+        except AuthenticationError:
+            if conn.url.path in self.paths:
+                return None
+            raise
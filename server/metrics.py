@@ -0,0 +1,147 @@
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette_jwt import TokenCache
+
+from rooms.events import LocalEventBus, bus
+from rooms.rooms_cache import RoomCache, room_cache
+from rooms.vote_batcher import VoteBatcher
+from server.request_metrics import RequestMetrics
+from users import passwords
+
+
+def password_hasher_metrics(hasher: passwords.PasswordHasher):
+    lines = [
+        '# HELP password_hasher_in_flight Password hash/verify jobs submitted and not yet finished.',
+        '# TYPE password_hasher_in_flight gauge',
+        f'password_hasher_in_flight {hasher.in_flight}',
+        '# HELP password_hasher_queue_depth Password jobs waiting for a free worker.',
+        '# TYPE password_hasher_queue_depth gauge',
+        f'password_hasher_queue_depth {hasher.queue_depth}',
+        '# HELP password_hasher_rejected_total Password jobs rejected because the queue was full.',
+        '# TYPE password_hasher_rejected_total counter',
+        f'password_hasher_rejected_total {hasher.rejected}',
+        '# HELP password_hasher_seconds Time from submitting a password job to getting its result.',
+        '# TYPE password_hasher_seconds histogram',
+    ]
+    for bound, count in zip(passwords.LATENCY_BUCKETS, hasher.latency_buckets):
+        lines.append(f'password_hasher_seconds_bucket{{le="{bound}"}} {count}')
+    lines.append(f'password_hasher_seconds_bucket{{le="+Inf"}} {hasher.latency_count}')
+    lines.append(f'password_hasher_seconds_sum {hasher.latency_sum}')
+    lines.append(f'password_hasher_seconds_count {hasher.latency_count}')
+    return lines
+
+
+def token_cache_metrics(cache: TokenCache):
+    return [
+        '# HELP jwt_cache_hits_total Requests authenticated from the verified-token cache.',
+        '# TYPE jwt_cache_hits_total counter',
+        f'jwt_cache_hits_total {cache.hits}',
+        '# HELP jwt_cache_misses_total Requests whose token had to be decoded and verified.',
+        '# TYPE jwt_cache_misses_total counter',
+        f'jwt_cache_misses_total {cache.misses}',
+        '# HELP jwt_cache_evictions_total Tokens evicted to keep the cache within its size limit.',
+        '# TYPE jwt_cache_evictions_total counter',
+        f'jwt_cache_evictions_total {cache.evictions}',
+        '# HELP jwt_cache_entries Verified tokens currently cached.',
+        '# TYPE jwt_cache_entries gauge',
+        f'jwt_cache_entries {len(cache)}',
+    ]
+
+
+def room_cache_metrics(cache: RoomCache):
+    return [
+        '# HELP room_cache_hits_total Room, topic and member lookups served from the room cache.',
+        '# TYPE room_cache_hits_total counter',
+        f'room_cache_hits_total {cache.hits}',
+        '# HELP room_cache_misses_total Room, topic and member lookups that went to the database.',
+        '# TYPE room_cache_misses_total counter',
+        f'room_cache_misses_total {cache.misses}',
+        '# HELP room_cache_hit_ratio Share of room cache lookups that were hits.',
+        '# TYPE room_cache_hit_ratio gauge',
+        f'room_cache_hit_ratio {cache.hit_rate}',
+        '# HELP room_cache_evictions_total Entries evicted to keep the room cache within its size limit.',
+        '# TYPE room_cache_evictions_total counter',
+        f'room_cache_evictions_total {cache.evictions}',
+        '# HELP room_cache_entries Entries currently in the room cache.',
+        '# TYPE room_cache_entries gauge',
+        f'room_cache_entries {len(cache)}',
+    ]
+
+
+def vote_batcher_metrics(batcher: VoteBatcher):
+    return [
+        '# HELP vote_batcher_flushes_total Vote batches written in a single transaction.',
+        '# TYPE vote_batcher_flushes_total counter',
+        f'vote_batcher_flushes_total {batcher.flushes}',
+        '# HELP vote_batcher_votes_total Votes written through the batcher.',
+        '# TYPE vote_batcher_votes_total counter',
+        f'vote_batcher_votes_total {batcher.flushed_votes}',
+    ]
+
+
+def _labels(method, route, **extra):
+    labels = {'method': method, 'route': route, **extra}
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def _histogram(name, histogram, labels):
+    lines = []
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
+
+
+def request_metrics(collector: RequestMetrics):
+    lines = [
+        '# HELP http_requests_in_flight HTTP requests currently being handled.',
+        '# TYPE http_requests_in_flight gauge',
+        f'http_requests_in_flight {collector.in_flight}',
+        '# HELP http_requests_total HTTP responses by route and status code.',
+        '# TYPE http_requests_total counter',
+    ]
+    for (method, route, status), count in sorted(collector.statuses.items()):
+        lines.append(f'http_requests_total{{{_labels(method, route, status=status)}}} {count}')
+    lines += [
+        '# HELP http_request_duration_seconds Time spent handling an HTTP request.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for (method, route), histogram in sorted(collector.latency.items()):
+        lines += _histogram('http_request_duration_seconds', histogram, _labels(method, route))
+    lines += [
+        '# HELP db_queries_per_request Database queries issued while handling one HTTP request.',
+        '# TYPE db_queries_per_request histogram',
+    ]
+    for (method, route), histogram in sorted(collector.queries.items()):
+        lines += _histogram('db_queries_per_request', histogram, _labels(method, route))
+    lines += [
+        '# HELP db_query_seconds_total Time spent executing database queries, by HTTP route.',
+        '# TYPE db_query_seconds_total counter',
+    ]
+    for (method, route), seconds in sorted(collector.query_seconds.items()):
+        lines.append(f'db_query_seconds_total{{{_labels(method, route)}}} {seconds}')
+    return lines
+
+
+def event_bus_metrics(events: LocalEventBus):
+    return [
+        '# HELP room_events_published_total Room events published by this process.',
+        '# TYPE room_events_published_total counter',
+        f'room_events_published_total {events.published}',
+        '# HELP room_events_received_total Room events received from other processes.',
+        '# TYPE room_events_received_total counter',
+        f'room_events_received_total {events.received}',
+    ]
+
+
+async def metrics(request: Request):
+    lines = request_metrics(request.app.state.request_metrics)
+    lines += password_hasher_metrics(passwords.hasher)
+    lines += token_cache_metrics(request.app.state.token_cache)
+    lines += room_cache_metrics(room_cache)
+    lines += event_bus_metrics(bus)
+    if request.app.state.vote_batcher is not None:
+        lines += vote_batcher_metrics(request.app.state.vote_batcher)
+    return PlainTextResponse('\n'.join(lines) + '\n', media_type='text/plain; version=0.0.4')
@@ -0,0 +1,71 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+
+from starlette.datastructures import Headers, QueryParams
+
+from database import query_stats
+
+
+def wants_profile(scope) -> bool:
+    if Headers(scope=scope).get('x-profile') == '1':
+        return True
+    return QueryParams(scope['query_string']).get('profile') == '1'
+
+
+def profile_name(scope) -> str:
+    path = re.sub(r'[^A-Za-z0-9]+', '_', scope['path']).strip('_') or 'root'
+    return f"{time.time_ns() // 1000}-{scope['method']}-{path}"
+
+
+def write_profile(directory: str, name: str, profiler: cProfile.Profile, stats: query_stats.QueryStats, seconds: float):
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(directory, name + '.prof'))
+    report = io.StringIO()
+    report.write(f'{name}: {seconds:.6f}s, {stats.count} queries in {stats.seconds:.6f}s\n\n')
+    for statement, parameters, elapsed in stats.statements:
+        report.write(f'{elapsed:.6f}s  {statement}  {parameters!r}\n')
+    report.write('\n')
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(50)
+    with open(os.path.join(directory, name + '.txt'), 'w') as f:
+        f.write(report.getvalue())
+
+
+class ProfilingMiddleware:
+    """Profiles requests sent with ``X-Profile: 1`` or ``?profile=1``.
+
+    cProfile hooks the whole thread, so requests running concurrently with a
+    profiled one show up in its profile too, and only one request is profiled
+    at a time. Meant for debugging only.
+    """
+
+    def __init__(self, app, directory: str):
+        self.app = app
+        self.directory = directory
+        self.active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or self.active or not wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        name = profile_name(scope)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + [(b'x-profile-file', name.encode())]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        self.active = True
+        with query_stats.collect(record_statements=True) as stats:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+                self.active = False
+        write_profile(self.directory, name, profiler, stats, time.perf_counter() - start)
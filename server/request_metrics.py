@@ -0,0 +1,83 @@
+import time
+from collections import defaultdict
+
+from starlette.routing import Match
+
+from database import query_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.in_flight = 0
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.query_seconds = defaultdict(float)
+        self.statuses = defaultdict(int)
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: query_stats.QueryStats):
+        key = (method, route)
+        self.latency[key].observe(seconds)
+        self.queries[key].observe(stats.count)
+        self.query_seconds[key] += stats.seconds
+        self.statuses[(method, route, status)] += 1
+
+
+def route_path(routes, scope, prefix=''):
+    partial = None
+    for route in routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.NONE:
+            continue
+        if getattr(route, 'routes', None) is not None:
+            return route_path(route.routes, {**scope, **child_scope}, prefix + route.path)
+        if match == Match.FULL:
+            return prefix + route.path
+        if partial is None:
+            partial = prefix + route.path
+    return partial
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        route = route_path(scope['app'].routes, scope) or 'unmatched'
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        self.metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            with query_stats.collect() as stats:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.in_flight -= 1
+            self.metrics.observe(scope['method'], route, status, time.perf_counter() - start, stats)
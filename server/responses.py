@@ -0,0 +1,47 @@
+import json
+import typing
+
+from starlette import responses
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class JSONResponse(responses.JSONResponse):
+    """``JSONResponse`` that encodes with orjson when it is installed."""
+
+    def render(self, content: typing.Any) -> bytes:
+        return dumps(content)
+
+
+async def json_array(chunks: typing.AsyncIterable[list], key: typing.Optional[str] = None):
+    yield b'[' if key is None else b'{' + dumps(key) + b':['
+    first = True
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        body = b','.join(dumps(item) for item in chunk)
+        yield body if first else b',' + body
+        first = False
+    yield b']' if key is None else b']}'
+
+
+class StreamingJSONArray(responses.StreamingResponse):
+    """Streams a JSON array from an async iterator of lists of items, one chunk at a time.
+
+    With ``key`` the array is wrapped in an object as ``{key: [...]}``.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, chunks: typing.AsyncIterable[list], key: typing.Optional[str] = None, status_code: int = 200,
+                 headers: typing.Optional[typing.Mapping[str, str]] = None) -> None:
+        super().__init__(json_array(chunks, key), status_code=status_code, headers=headers)
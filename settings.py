@@ -0,0 +1,43 @@
+import os
+
+# Split the cores between server workers so N workers don't run N x cores bcrypt processes.
+HASH_WORKERS = int(os.environ.get('ROOMS_HASH_WORKERS',
+                                  max(1, (os.cpu_count() or 1) // int(os.environ.get('ROOMS_WORKERS', 1)))))
+HASH_QUEUE_LIMIT = int(os.environ.get('ROOMS_HASH_QUEUE_LIMIT', 64))
+
+SQLITE_JOURNAL_MODE = os.environ.get('ROOMS_SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('ROOMS_SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('ROOMS_SQLITE_BUSY_TIMEOUT', 5000))
+SQLITE_MMAP_SIZE = int(os.environ.get('ROOMS_SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = int(os.environ.get('ROOMS_SQLITE_CACHE_SIZE', -64 * 1024))
+SQLITE_TEMP_STORE = os.environ.get('ROOMS_SQLITE_TEMP_STORE', 'MEMORY')
+SQLITE_POOL_SIZE = int(os.environ.get('ROOMS_SQLITE_POOL_SIZE', 8))
+SQLITE_MAX_OVERFLOW = int(os.environ.get('ROOMS_SQLITE_MAX_OVERFLOW', 8))
+
+JWT_CACHE_SIZE = int(os.environ.get('ROOMS_JWT_CACHE_SIZE', 10000))
+
+ROOM_CACHE_SIZE = int(os.environ.get('ROOMS_ROOM_CACHE_SIZE', 30000))
+ROOM_CACHE_TTL = float(os.environ.get('ROOMS_ROOM_CACHE_TTL', 30))
+
+VOTE_BATCHING = os.environ.get('ROOMS_VOTE_BATCHING', '0') == '1'
+VOTE_BATCH_INTERVAL_MS = int(os.environ.get('ROOMS_VOTE_BATCH_INTERVAL_MS', 20))
+VOTE_BATCH_SIZE = int(os.environ.get('ROOMS_VOTE_BATCH_SIZE', 200))
+
+PROFILING = os.environ.get('ROOMS_PROFILING', '0') == '1'
+PROFILE_DIR = os.environ.get('ROOMS_PROFILE_DIR', 'profiles')
+
+SECRET_KEY = os.environ.get('ROOMS_SECRET_KEY', 'secret')
+ACCESS_TOKEN_MINUTES = int(os.environ.get('ROOMS_ACCESS_TOKEN_MINUTES', 15))
+REFRESH_TOKEN_DAYS = int(os.environ.get('ROOMS_REFRESH_TOKEN_DAYS', 30))
+INVITE_TTL = int(os.environ.get('ROOMS_INVITE_TTL', 86400))
+INVITE_MAX_TTL = int(os.environ.get('ROOMS_INVITE_MAX_TTL', 7 * 86400))
+DEBUG = os.environ.get('ROOMS_DEBUG', '0') == '1'
+HOST = os.environ.get('ROOMS_HOST', '127.0.0.1')
+PORT = int(os.environ.get('ROOMS_PORT', 8000))
+WORKERS = int(os.environ.get('ROOMS_WORKERS', 1))
+
+EVENT_BUS = os.environ.get('ROOMS_EVENT_BUS', 'sqlite')
+EVENT_POLL_INTERVAL_MS = int(os.environ.get('ROOMS_EVENT_POLL_INTERVAL_MS', 50))
+EVENT_RETENTION = float(os.environ.get('ROOMS_EVENT_RETENTION', 300))
+
+GZIP_MIN_SIZE = int(os.environ.get('ROOMS_GZIP_MIN_SIZE', 1024))
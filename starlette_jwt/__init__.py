@@ -1,6 +1,7 @@
-from .middleware import JWTAuthenticationBackend, JWTUser
+from .cache import TokenCache
+from .middleware import JWTAuthenticationBackend, JWTUser, JWTWebSocketAuthenticationBackend
 
 __author__ = """Amit Ripshtos"""
 __version__ = '0.1.9'
 
-__all__ = ['JWTAuthenticationBackend', 'JWTUser']
\ No newline at end of file
+__all__ = ['JWTAuthenticationBackend', 'JWTUser', 'JWTWebSocketAuthenticationBackend', 'TokenCache']
\ No newline at end of file
@@ -4,6 +4,8 @@ from starlette.authentication import (
     UnauthenticatedUser)
 from typing import Optional, Tuple, Union
 
+from .cache import TokenCache
+
 
 class JWTUser(BaseUser):
     def __init__(self, sub: int, username: str, token: str, payload: dict) -> None:
@@ -21,6 +23,23 @@ class JWTUser(BaseUser):
         return self.username
 
 
+def verify_token(backend, token: str) -> JWTUser:
+    if backend.cache is not None:
+        cached = backend.cache.get(token)
+        if cached is not None:
+            return cached[1]
+    try:
+        payload = jwt.decode(token, key=backend.secret_key, algorithms=backend.algorithm, audience=backend.audience,
+                             options=backend.options)
+    except jwt.InvalidTokenError as e:
+        raise AuthenticationError(str(e))
+
+    user = JWTUser(sub=payload[backend.sub], username=payload[backend.username_field], token=token, payload=payload)
+    if backend.cache is not None:
+        backend.cache.set(token, payload, user)
+    return user
+
+
 class JWTAuthenticationBackend(AuthenticationBackend):
 
     def __init__(self,
@@ -30,7 +49,8 @@ class JWTAuthenticationBackend(AuthenticationBackend):
                  username_field: str = 'username',
                  sub: str = 'sub',
                  audience: Optional[str] = None,
-                 options: Optional[dict] = None) -> None:
+                 options: Optional[dict] = None,
+                 cache: Optional[TokenCache] = None) -> None:
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.prefix = prefix
@@ -38,6 +58,7 @@ class JWTAuthenticationBackend(AuthenticationBackend):
         self.sub = sub
         self.audience = audience
         self.options = options or dict()
+        self.cache = cache
 
     @classmethod
     def get_token_from_header(cls, authorization: str, prefix: str) -> str:
@@ -56,14 +77,7 @@ class JWTAuthenticationBackend(AuthenticationBackend):
 
         auth = request.headers["Authorization"]
         token = self.get_token_from_header(authorization=auth, prefix=self.prefix)
-        try:
-            payload = jwt.decode(token, key=self.secret_key, algorithms=self.algorithm, audience=self.audience,
-                                 options=self.options)
-        except jwt.InvalidTokenError as e:
-            raise AuthenticationError(str(e))
-
-        return AuthCredentials(["authenticated"]), JWTUser(sub=payload[self.sub], username=payload[self.username_field], token=token,
-                                                           payload=payload)
+        return AuthCredentials(["authenticated"]), verify_token(self, token)
 
 
 class JWTWebSocketAuthenticationBackend(AuthenticationBackend):
@@ -75,7 +89,8 @@ class JWTWebSocketAuthenticationBackend(AuthenticationBackend):
                  sub: str = 'sub',
                  username_field: str = 'username',
                  audience: Optional[str] = None,
-                 options: Optional[dict] = None) -> None:
+                 options: Optional[dict] = None,
+                 cache: Optional[TokenCache] = None) -> None:
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.query_param_name = query_param_name
@@ -83,18 +98,11 @@ class JWTWebSocketAuthenticationBackend(AuthenticationBackend):
         self.username_field = username_field
         self.audience = audience
         self.options = options or dict()
+        self.cache = cache
 
     async def authenticate(self, request) -> Tuple[AuthCredentials, BaseUser]:
         if self.query_param_name not in request.query_params:
             return AuthCredentials(), UnauthenticatedUser()
 
         token = request.query_params[self.query_param_name]
-
-        try:
-            payload = jwt.decode(token, key=self.secret_key, algorithms=self.algorithm, audience=self.audience,
-                                 options=self.options)
-        except jwt.InvalidTokenError as e:
-            raise AuthenticationError(str(e))
-
-        return AuthCredentials(["authenticated"]), JWTUser(sub=payload[self.sub], username=payload[self.username_field], token=token,
-                                                           payload=payload)
+        return AuthCredentials(["authenticated"]), verify_token(self, token)
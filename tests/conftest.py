@@ -0,0 +1,66 @@
+import pytest
+from starlette.testclient import TestClient
+
+import server
+from commands import seed
+from database import database
+
+PASSWORD = 'password'
+
+
+@pytest.fixture
+def seeds():
+    """``seed_database`` keyword arguments, one dict per call; override in a module to shape the data."""
+    return [dict(users=2, rooms=1, members=1)]
+
+
+@pytest.fixture
+def database_path(tmp_path, monkeypatch, seeds):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / 'database.sqlite')
+    db = database.get_db(path)
+    database.initialize_db(db)
+    for kwargs in seeds:
+        seed.seed_database(db, password=PASSWORD, **kwargs)
+    db.dispose()
+    return path
+
+
+@pytest.fixture
+def engine(database_path):
+    db = database.get_db(database_path)
+    yield db
+    db.dispose()
+
+
+@pytest.fixture
+def client(database_path):
+    with TestClient(server.create_app()) as client:
+        yield client
+
+
+@pytest.fixture
+def login(client):
+    def login(user: str, password: str = PASSWORD) -> dict:
+        return client.post('/api/users/login', json={'login': user, 'password': password}).json()
+    return login
+
+
+@pytest.fixture
+def headers(login):
+    def headers(user: str) -> dict:
+        return {'Authorization': 'JWT ' + login(user)['token']}
+    return headers
+
+
+@pytest.fixture
+def room_logins(engine):
+    """``(owner, other members, non-members)`` logins of room 1."""
+    with engine.connect() as conn:
+        owner = conn.exec_driver_sql("SELECT u.login FROM rooms r JOIN users u ON u.user_id = r.owner_id "
+                                     "WHERE r.room_id = 1").scalar()
+        members = conn.exec_driver_sql("SELECT u.login FROM user_room ur JOIN users u ON u.user_id = ur.user_id "
+                                       "WHERE ur.room_id = 1 AND u.login != ? ORDER BY u.login", (owner,)).scalars().all()
+        outsiders = conn.exec_driver_sql("SELECT login FROM users WHERE user_id NOT IN "
+                                         "(SELECT user_id FROM user_room WHERE room_id = 1) ORDER BY login").scalars().all()
+    return owner, members, outsiders
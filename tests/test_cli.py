@@ -0,0 +1,16 @@
+import sqlite3
+
+from click.testing import CliRunner
+
+import main
+
+
+def test_refuses_unmigrated_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sqlite3.connect(tmp_path / 'database.sqlite').close()
+
+    result = CliRunner().invoke(main.run_application, ['login', '--login', 'admin', '--password', 'admin',
+                                                       'rate_topic', '--room_id', '1', '--rate', '5'])
+
+    assert result.exit_code == 1
+    assert 'python main.py migrate' in result.output
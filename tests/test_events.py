@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from database import database
+from rooms.events import SqliteEventBus, bus
+from users import users_service
+
+
+@pytest.fixture
+def seeds():
+    return [dict(users=3, rooms=2, members=3)]
+
+
+@pytest.fixture
+def db(engine):
+    with engine.connect() as conn:
+        yield conn
+
+
+def test_remove_user_publishes_room_events(db):
+    received = []
+    bus.subscribe(lambda room_id, event: received.append((room_id, event['type'])))
+    try:
+        owned = {row[0] for row in db.exec_driver_sql("SELECT room_id FROM rooms WHERE owner_id = 1")}
+        users_service.remove_user(db, 'user1')
+    finally:
+        bus.handlers.pop()
+    assert sorted(received) == sorted((room_id, 'room_deleted' if room_id in owned else 'member_left')
+                                      for room_id in (1, 2))
+
+
+def test_publish_prunes_old_events(db):
+    publisher = SqliteEventBus(interval_ms=50, retention=60)
+    with database.transaction(db):
+        db.exec_driver_sql("INSERT INTO room_events (origin, room_id, payload, created_at) VALUES ('old', 1, '{}', ?)",
+                           (time.time() - 120,))
+    publisher.publish(db, 1, 'room_updated')
+    assert db.exec_driver_sql("SELECT origin FROM room_events").scalars().all() == [publisher.origin]
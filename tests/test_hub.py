@@ -0,0 +1,40 @@
+import asyncio
+
+from server.api.rooms.hub import RoomHub
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed = True
+
+
+def test_deltas_wait_for_snapshot():
+    async def scenario():
+        hub, websocket = RoomHub(), FakeSocket()
+        hub.subscribe(1, websocket, 7)
+        await hub.publish(1, {'type': 'vote', 'value': 1})
+        assert websocket.sent == []
+        await websocket.send_json({'type': 'snapshot'})
+        assert await hub.ready(websocket)
+        await hub.publish(1, {'type': 'vote', 'value': 2})
+        return websocket.sent
+
+    assert [message.get('value') for message in asyncio.run(scenario())] == [None, 1, 2]
+
+
+def test_leave_before_snapshot_drops_socket():
+    async def scenario():
+        hub, websocket = RoomHub(), FakeSocket()
+        hub.subscribe(1, websocket, 7)
+        await hub.close(1, 7)
+        return websocket, await hub.ready(websocket), hub.rooms
+
+    websocket, ready, rooms = asyncio.run(scenario())
+    assert not ready and not websocket.closed and rooms == {}
@@ -0,0 +1,31 @@
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def seeds():
+    return [dict(users=3, rooms=1, members=1)]
+
+
+def test_password_change_elsewhere_revokes_invites(client, headers, room_logins, database_path):
+    owner, _, outsiders = room_logins
+    owner_headers = headers(owner)
+
+    invite = client.post('/api/rooms/1/invite', headers=owner_headers).json()['invite']
+    # Warm this process' room cache, then change the password behind its back.
+    assert client.put('/api/rooms/1/vote', headers=owner_headers, json={'vote': 3}).status_code == 200
+    with sqlite3.connect(database_path) as conn:
+        conn.execute("UPDATE rooms SET password = 'changed' WHERE room_id = 1")
+    conn.close()
+
+    response = client.post('/api/rooms/1/join', headers=headers(outsiders[0]), json={'invite': invite})
+    assert response.status_code == 403
+
+
+def test_password_join_rejects_wrong_password_and_rejoin(client, headers, room_logins):
+    guest_headers = headers(room_logins[2][0])
+
+    assert client.post('/api/rooms/1/join', headers=guest_headers, json={'password': 'wrong'}).status_code == 403
+    assert client.post('/api/rooms/1/join', headers=guest_headers, json={'password': 'password'}).status_code == 200
+    assert client.post('/api/rooms/1/join', headers=guest_headers, json={'password': 'password'}).status_code == 403
@@ -0,0 +1,28 @@
+import datetime
+
+import jwt
+
+import settings
+
+
+def expired_token(user_id: int, username: str) -> str:
+    payload = {"sub": user_id, "username": username,
+               "exp": datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(minutes=1)}
+    return jwt.encode(payload=payload, key=settings.SECRET_KEY, algorithm='HS256')
+
+
+def test_refresh_with_expired_access_token(client, login):
+    tokens = login('user1')
+    user_id = jwt.decode(tokens['token'], key=settings.SECRET_KEY, algorithms=['HS256'])['sub']
+    headers = {'Authorization': 'JWT ' + expired_token(user_id, 'user1')}
+
+    response = client.post('/api/users/refresh', headers=headers, json={'refresh_token': tokens['refresh_token']})
+
+    assert response.status_code == 200
+    assert set(response.json()) == {'token', 'refresh_token'}
+    assert client.get('/api/users/list', headers={'Authorization': 'JWT ' + response.json()['token']}).status_code == 200
+
+
+def test_expired_access_token_still_rejected_elsewhere(client):
+    headers = {'Authorization': 'JWT ' + expired_token(1, 'user1')}
+    assert client.get('/api/users/list', headers=headers).status_code == 400
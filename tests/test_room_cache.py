@@ -0,0 +1,37 @@
+import pytest
+
+from database import database
+from rooms import rooms_service
+from rooms.rooms_cache import room_cache
+
+
+@pytest.fixture
+def seeds():
+    return [dict(users=2, rooms=1, members=2)]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    room_cache.clear()
+    yield
+    room_cache.clear()
+
+
+def test_vote_during_summary_fill_is_not_lost(engine):
+    with engine.connect() as reader, engine.connect() as writer:
+        user_id = writer.exec_driver_sql("SELECT user_id FROM user_room WHERE room_id = 1").fetchone()[0]
+        execute = reader.exec_driver_sql
+
+        def vote_during_select(statement, *args, **kwargs):
+            result = execute(statement, *args, **kwargs)
+            if statement.startswith("SELECT user_id, topic_rating"):
+                assert rooms_service.update_rating_of_room(writer, user_id, 1, 8)
+            return result
+
+        reader.exec_driver_sql = vote_during_select
+        with database.transaction(reader):
+            rooms_service.get_vote_summary(reader, 1)
+        reader.exec_driver_sql = execute
+
+        assert room_cache.get(1, 'votes') is None
+        assert rooms_service.get_vote_summary(reader, 1).votes[user_id] == 8
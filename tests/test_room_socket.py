@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.fixture
+def seeds():
+    # Push the room's users past the small-int cache so identity checks would fail.
+    return [dict(users=300, rooms=0, members=0, prefix='filler'), dict(users=2, rooms=1, members=2)]
+
+
+def test_owner_cannot_leave(client, headers, room_logins):
+    owner_headers = headers(room_logins[0])
+    assert client.post('/api/rooms/1/leave', headers=owner_headers).status_code == 400
+    assert client.get('/api/rooms/1', headers=owner_headers).status_code == 200
+
+
+def test_leaver_socket_is_closed(client, login, room_logins):
+    member = room_logins[1][0]
+    member_token = login(member)['token']
+    with client.websocket_connect('/api/rooms/1/ws?jwt=' + member_token) as ws:
+        assert ws.receive_json()['type'] == 'snapshot'
+        client.post('/api/rooms/1/leave', headers={'Authorization': 'JWT ' + member_token})
+        assert ws.receive_json() == {'type': 'member_left', 'username': member}
+        assert ws.receive()['type'] == 'websocket.close'
@@ -0,0 +1,43 @@
+import pytest
+
+from commands import seed
+
+
+@pytest.fixture
+def seeds():
+    return []
+
+
+@pytest.fixture
+def db(engine):
+    return engine
+
+
+def counts(db):
+    with db.connect() as conn:
+        return [conn.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar()
+                for table in ('users', 'rooms', 'topics', 'user_room')]
+
+
+def test_prefix_is_lowercased(db):
+    seed.seed_database(db, 2, 0, 0, prefix='Bob')
+    with db.connect() as conn:
+        assert [row[0] for row in conn.exec_driver_sql("SELECT login FROM users ORDER BY login")] == ['bob1', 'bob2']
+
+
+def test_rooms_need_users(db):
+    with pytest.raises(ValueError):
+        seed.seed_database(db, 0, 3, 0)
+
+
+def test_failed_seed_removes_committed_batches(db):
+    seed.seed_database(db, 3, 1, 2)
+    before = counts(db)
+    with db.connect() as conn:
+        conn.exec_driver_sql("CREATE TRIGGER fail_seed BEFORE INSERT ON user_room WHEN new.room_id > 2 "
+                             "BEGIN SELECT RAISE(ABORT, 'fail'); END")
+
+    with pytest.raises(Exception, match='fail'):
+        seed.seed_database(db, 10, 3, 2, batch_size=2)
+
+    assert counts(db) == before
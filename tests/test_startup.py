@@ -0,0 +1,18 @@
+import sqlite3
+
+import pytest
+from starlette.testclient import TestClient
+
+import server
+
+
+def test_refuses_unmigrated_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect(tmp_path / 'database.sqlite')
+    conn.execute("CREATE TABLE rooms (room_id integer PRIMARY KEY, name text NOT NULL, password text NOT NULL, "
+                 "owner_id integer NOT NULL)")
+    conn.close()
+
+    with pytest.raises(RuntimeError, match='migrate'):
+        with TestClient(server.create_app()):
+            pass
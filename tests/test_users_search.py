@@ -0,0 +1,25 @@
+import sys
+
+import pytest
+
+from users import users_service
+
+
+@pytest.fixture
+def seeds():
+    return [dict(users=3, rooms=0, members=0, prefix='alice')]
+
+
+@pytest.fixture
+def db(engine):
+    with engine.connect() as conn:
+        yield conn
+
+
+def test_prefix_is_case_insensitive(db):
+    assert [row[1] for row in users_service.search_users(db, 'Ali')] == ['alice1', 'alice2', 'alice3']
+
+
+@pytest.mark.parametrize('prefix', ['a' + chr(sys.maxunicode), chr(sys.maxunicode), chr(0xD7FF)])
+def test_prefix_at_code_point_edges(db, prefix):
+    assert users_service.search_users(db, prefix) == []
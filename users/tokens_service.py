@@ -0,0 +1,58 @@
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Optional, Tuple
+
+import settings
+from database.database import transaction
+from database.users_model import User
+
+
+def token_hash(token: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), token.encode(), hashlib.sha256).hexdigest()
+
+
+def issue_refresh_token(db, user_id: int) -> str:
+    token = secrets.token_urlsafe(32)
+    now = time.time()
+    with transaction(db):
+        db.exec_driver_sql("DELETE FROM refresh_tokens WHERE user_id = ? AND expires_at < ?", (user_id, now))
+        db.exec_driver_sql("INSERT INTO refresh_tokens (token_hash, user_id, expires_at) VALUES (?, ?, ?)",
+                           (token_hash(token), user_id, now + settings.REFRESH_TOKEN_DAYS * 86400))
+    return token
+
+
+def rotate_refresh_token(db, token: str) -> Optional[Tuple[User, str]]:
+    """Revokes ``token`` and returns its user with a new refresh token.
+
+    A token that was already revoked is being reused, most likely after it
+    leaked, so every refresh token of its user is revoked as well.
+    """
+    digest = token_hash(token)
+    with transaction(db):
+        revoked = db.exec_driver_sql("UPDATE refresh_tokens SET revoked = 1 "
+                                     "WHERE token_hash = ? AND revoked = 0 AND expires_at > ?",
+                                     (digest, time.time())).rowcount
+        row = db.exec_driver_sql("SELECT u.user_id, u.login, rt.revoked FROM refresh_tokens rt "
+                                 "JOIN users u ON u.user_id = rt.user_id WHERE rt.token_hash = ?",
+                                 (digest,)).fetchone()
+        if row is None:
+            return None
+        if not revoked:
+            if row[2]:
+                revoke_user_tokens(db, row[0])
+            return None
+        return User(user_id=row[0], login=row[1]), issue_refresh_token(db, row[0])
+
+
+def revoke_refresh_token(db, token: str) -> bool:
+    with transaction(db):
+        return db.exec_driver_sql("UPDATE refresh_tokens SET revoked = 1 WHERE token_hash = ? AND revoked = 0",
+                                  (token_hash(token),)).rowcount > 0
+
+
+def revoke_user_tokens(db, user_id: int) -> int:
+    with transaction(db):
+        return db.exec_driver_sql("UPDATE refresh_tokens SET revoked = 1 WHERE user_id = ? AND revoked = 0",
+                                  (user_id,)).rowcount
@@ -0,0 +1,46 @@
+from database.users_model import User
+from users import passwords
+from users import tokens_service
+from users import users_service
+
+
+async def has_user(db, user_login: str):
+    return await db.run_sync(users_service.has_user, user_login)
+
+
+async def login(db, user_login: str, password: str):
+    user = await db.run_sync(users_service.get_user_credentials, user_login)
+    if user is None:
+        return None
+    if not await passwords.hasher.check(password, user[2]):
+        return None
+    return User(user_id=user[0], login=user[1])
+
+
+async def create_user(db, user_login: str, password: str):
+    hashed_psw = await passwords.hasher.hash(password)
+    await db.run_sync(users_service.insert_user, user_login, hashed_psw)
+
+
+async def get_all_users(db):
+    return await db.run_sync(users_service.get_all_users)
+
+
+async def search_users(db, prefix=None, after=None, limit: int = 100):
+    return await db.run_sync(users_service.search_users, prefix, after, limit)
+
+
+async def get_user(db, user_id: int):
+    return await db.run_sync(users_service.get_user, user_id)
+
+
+async def issue_refresh_token(db, user_id: int):
+    return await db.run_sync(tokens_service.issue_refresh_token, user_id)
+
+
+async def rotate_refresh_token(db, token: str):
+    return await db.run_sync(tokens_service.rotate_refresh_token, token)
+
+
+async def revoke_refresh_token(db, token: str):
+    return await db.run_sync(tokens_service.revoke_refresh_token, token)
@@ -1,9 +1,12 @@
 import re
+import sys
 from typing import List
 
-import bcrypt
-
+from database.database import transaction
 from database.users_model import User
+from rooms import rooms_service
+from rooms.events import bus
+from users import passwords
 
 LOGIN_RE = r'^[a-zA-Z0-9]+$'
 
@@ -20,43 +23,114 @@ def validate_password(password: str):
 
 
 def has_user(db, user_login: str):
-    with db.begin():
-        users = db.execute("SELECT * FROM users WHERE login = ?", (user_login,)).fetchall()
+    with transaction(db):
+        users = db.exec_driver_sql("SELECT * FROM users WHERE login = ?", (user_login,)).fetchall()
     if len(users) > 0:
         return True
     return False
 
 
+def get_user_credentials(db, user_login: str):
+    with transaction(db):
+        return db.exec_driver_sql("SELECT * FROM users WHERE login = ?", (user_login,)).fetchone()
+
+
 def login(db, user_login: str, password: str):
-    with db.begin():
-        user = db.execute("SELECT * FROM users WHERE login = ?", (user_login,)).fetchone()
+    user = get_user_credentials(db, user_login)
     if user is None:
         return None
-    if not bcrypt.checkpw(password.encode('utf-8'), user[2].encode('utf-8')):
+    if not passwords.check_password(password, user[2]):
         return None
     return User(user_id=user[0], login=user[1])
 
 
+
+def insert_user(db, user_login: str, hashed_psw: str):
+    with transaction(db):
+        db.exec_driver_sql("INSERT INTO users (login, password) VALUES (?, ?)", (user_login.lower(), hashed_psw))
+
+
 def create_user(db, user_login: str, password: str):
-    salt = bcrypt.gensalt()
-    password = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
-    with db.begin():
-        db.execute("INSERT INTO users (login, password) VALUES (?, ?)", (user_login.lower(), password))
+    insert_user(db, user_login, passwords.hash_password(password))
+
 
 
 def get_all_users(db) -> List[User]:
-    with db.begin():
-        return [User(user_id=row[0], login=row[1]) for row in db.execute("SELECT * FROM users").fetchall()]
+    with transaction(db):
+        return [User(user_id=row[0], login=row[1]) for row in db.exec_driver_sql("SELECT * FROM users").fetchall()]
+
+
+def prefix_upper_bound(prefix: str):
+    """Smallest string greater than every string starting with ``prefix``, or None if there is none."""
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return None
+    code = ord(stem[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        code = 0xE000
+    return stem[:-1] + chr(code)
+
+
+def _users_filter(filter=None, prefix=None, after=None):
+    conditions, params = [], []
+    if prefix:
+        prefix = prefix.lower()
+        upper = prefix_upper_bound(prefix)
+        if upper is None:
+            conditions.append("login >= ?")
+            params.append(prefix)
+        else:
+            conditions.append("login >= ? AND login < ?")
+            params += [prefix, upper]
+    if after is not None:
+        conditions.append("login > ?")
+        params.append(after)
+    if filter is not None:
+        conditions.append("instr(login, ?) > 0")
+        params.append(filter)
+    if not conditions:
+        return "", ()
+    return " WHERE " + " AND ".join(conditions), tuple(params)
+
+
+def search_users(db, prefix=None, after=None, limit: int = 100) -> list:
+    where, params = _users_filter(prefix=prefix, after=after)
+    with transaction(db):
+        return db.exec_driver_sql("SELECT user_id, login FROM users" + where + " ORDER BY login LIMIT ?",
+                                  params + (limit,)).fetchall()
+
+
+def iter_users(db, filter=None, chunk_size: int = 1000, prefix=None, after=None, limit=None):
+    where, params = _users_filter(filter, prefix, after)
+    sql = "SELECT user_id, login FROM users" + where + " ORDER BY login"
+    if limit is not None:
+        sql, params = sql + " LIMIT ?", params + (limit,)
+    with transaction(db):
+        result = db.execution_options(stream_results=True).exec_driver_sql(sql, params)
+        yield from result.partitions(chunk_size)
 
 
 def get_user(db, user_id: int):
-    with db.begin():
-        db_user = db.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+    with transaction(db):
+        db_user = db.exec_driver_sql("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
     if db_user is None:
         return None
     return User(user_id=db_user[0], login=db_user[1])
 
 
 def remove_user(db, user_login):
-    with db.begin():
-        db.execute("DELETE FROM users WHERE login = ?", (user_login, ))
+    with transaction(db):
+        user_id = db.exec_driver_sql("SELECT user_id FROM users WHERE login = ?", (user_login, )).scalar()
+        if user_id is None:
+            return
+        # Rooms the user owns are deleted with them; the others just lose a member.
+        owned = [row[0] for row in db.exec_driver_sql("SELECT room_id FROM rooms WHERE owner_id = ?", (user_id, ))]
+        joined = [row[0] for row in db.exec_driver_sql("SELECT room_id FROM user_room WHERE user_id = ? "
+                                                       "AND room_id NOT IN (SELECT room_id FROM rooms WHERE owner_id = ?)",
+                                                       (user_id, user_id))]
+        rooms_service.bump_versions(db, joined)
+        db.exec_driver_sql("DELETE FROM users WHERE user_id = ?", (user_id, ))
+        events = [(room_id, {'type': 'member_left', 'user_id': user_id, 'login': user_login}) for room_id in joined]
+        events += [(room_id, {'type': 'room_deleted'}) for room_id in owned]
+        if events:
+            bus.publish_many(db, events)